@@ -2,22 +2,22 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import List, Optional, Union, Any
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     line: int = 0
     column: int = 0
 
 # ---------- Program / Function ----------
-@dataclass
+@dataclass(slots=True)
 class Program(Node):
     functions: List["FunctionDef"] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Param(Node):
     name: str = ""
     type_name: str = "null"
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDef(Node):
     name: str = ""
     return_type: str = "null"
@@ -26,43 +26,44 @@ class FunctionDef(Node):
     arrow_return_expr: Optional["Expr"] = None
 
 # ---------- Statements ----------
-class Stmt(Node): ...
+class Stmt(Node):
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class Block(Stmt):
     statements: List[Stmt] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class VarDecl(Stmt):
     name: str = ""
     type_name: str = "null"
     init: Optional["Expr"] = None
 
-@dataclass
+@dataclass(slots=True)
 class Return(Stmt):
     value: Optional["Expr"] = None
 
-@dataclass
+@dataclass(slots=True)
 class ExprStmt(Stmt):
     expr: "Expr" = None
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(Stmt):
     cond: "Expr" = None
     then_block: Block = None
     else_block: Optional[Block] = None
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(Stmt):
     cond: "Expr" = None
     body: Block = None
 
-@dataclass
+@dataclass(slots=True)
 class DoWhileStmt(Stmt):
     body: Block = None
     cond: "Expr" = None
 
-@dataclass
+@dataclass(slots=True)
 class ForStmt(Stmt):
     var_name: str = ""
     start: "Expr" = None
@@ -70,56 +71,57 @@ class ForStmt(Stmt):
     body: Block = None
 
 # ---------- Expressions ----------
-class Expr(Node): ...
+class Expr(Node):
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class Number(Expr):
     value: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class String(Expr):
     value: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class MString(Expr):
     value: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(Expr):
     name: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Expr):
     target: Identifier = None
     value: Expr = None
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Expr):
     op: str = ""
     operand: Expr = None
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(Expr):
     op: str = ""
     left: Expr = None
     right: Expr = None
 
-@dataclass
+@dataclass(slots=True)
 class TernaryOp(Expr):
     cond: Expr = None
     then_expr: Expr = None
     else_expr: Expr = None
 
-@dataclass
+@dataclass(slots=True)
 class Call(Expr):
     func: Identifier = None
     args: List[Expr] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class VectorLiteral(Expr):
     items: List[Expr] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Index(Expr):
     base: Expr = None
     index: Expr = None
@@ -0,0 +1,308 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from ast_nodes import *
+
+# AST-level cleanups run by the code generator before lowering:
+#   fold()  - evaluate operators whose operands are integer literals
+#   cse()   - lift expressions repeated inside a straight-line run of
+#             statements into a synthetic local, computed once
+# Both work on an already type-checked tree.
+
+_ARITH = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "<": lambda a, b: int(a < b),
+    ">": lambda a, b: int(a > b),
+    "<=": lambda a, b: int(a <= b),
+    ">=": lambda a, b: int(a >= b),
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+}
+_LOGIC = {"&&": lambda a, b: a & b, "||": lambda a, b: a | b}
+_BOOL_OPS = {"<", ">", "<=", ">=", "==", "!=", "&&", "||", "!"}
+
+# TSVM immediates are non-negative 32-bit signed words; a result outside
+# that range is not folded and is left for the VM to compute
+_IMM_MAX = 2**31 - 1
+
+def _num(v: int, like: Node) -> Number:
+    return Number(value=v, line=like.line, column=like.column)
+
+def _folded(v: int, e: Expr) -> Expr:
+    return _num(v, e) if 0 <= v <= _IMM_MAX else e
+
+def fold(e: Expr) -> Expr:
+    """Return e with every literal-only operator replaced by its value."""
+    if isinstance(e, BinaryOp):
+        e.left = fold(e.left)
+        e.right = fold(e.right)
+        if isinstance(e.left, Number) and isinstance(e.right, Number):
+            a, b = e.left.value, e.right.value
+            if e.op in _ARITH:
+                return _folded(_ARITH[e.op](a, b), e)
+            if e.op in _LOGIC and a in (0, 1) and b in (0, 1):
+                return _num(_LOGIC[e.op](a, b), e)
+            # only fold division where truncating and flooring agree
+            if e.op == "/" and b != 0 and (a % b == 0 or (a >= 0 and b > 0)):
+                return _folded(a // b, e)
+        # && / || short-circuit: a deciding left literal drops the right side
+        elif isinstance(e.left, Number):
+            if (e.op == "&&" and e.left.value == 0) or (e.op == "||" and e.left.value == 1):
+                return _num(e.left.value, e)
+        return e
+    if isinstance(e, UnaryOp):
+        e.operand = fold(e.operand)
+        if isinstance(e.operand, Number):
+            v = e.operand.value
+            if e.op == "-":
+                return _folded(-v, e)
+            if e.op == "+":
+                return _folded(v, e)
+            if e.op == "!" and v in (0, 1):
+                return _num(1 - v, e)
+        return e
+    if isinstance(e, Assign):
+        e.value = fold(e.value)
+    elif isinstance(e, TernaryOp):
+        e.cond = fold(e.cond)
+        e.then_expr = fold(e.then_expr)
+        e.else_expr = fold(e.else_expr)
+    elif isinstance(e, Call):
+        e.args = [fold(a) for a in e.args]
+    elif isinstance(e, VectorLiteral):
+        e.items = [fold(a) for a in e.items]
+    elif isinstance(e, Index):
+        e.base = fold(e.base)
+        e.index = fold(e.index)
+    return e
+
+def _fold_block(block: Block):
+    for st in block.statements:
+        if isinstance(st, VarDecl):
+            if st.init is not None:
+                st.init = fold(st.init)
+        elif isinstance(st, ExprStmt):
+            st.expr = fold(st.expr)
+        elif isinstance(st, Return):
+            if st.value is not None:
+                st.value = fold(st.value)
+        elif isinstance(st, IfStmt):
+            st.cond = fold(st.cond)
+            _fold_block(st.then_block)
+            if st.else_block:
+                _fold_block(st.else_block)
+        elif isinstance(st, (WhileStmt, DoWhileStmt)):
+            st.cond = fold(st.cond)
+            _fold_block(st.body)
+        elif isinstance(st, ForStmt):
+            st.start = fold(st.start)
+            st.end = fold(st.end)
+            _fold_block(st.body)
+        elif isinstance(st, Block):
+            _fold_block(st)
+        elif isinstance(st, FunctionDef):
+            _fold_function(st)
+
+def _fold_function(fn: FunctionDef):
+    if fn.arrow_return_expr is not None:
+        fn.arrow_return_expr = fold(fn.arrow_return_expr)
+    if fn.body is not None:
+        _fold_block(fn.body)
+
+# ---------- CSE ----------
+
+# nodes _assigned_names doesn't look into: a nested function's locals are
+# its own, and leaves have nothing under them
+_NO_ASSIGNS = (FunctionDef, Number, String, MString, Identifier)
+
+def _assigned_names(node, out: set):
+    # every local a statement (or anything nested in it) may write
+    if isinstance(node, _NO_ASSIGNS):
+        return
+    if isinstance(node, Assign):
+        out.add(node.target.name)
+    elif isinstance(node, VarDecl):
+        out.add(node.name)
+    elif isinstance(node, ForStmt):
+        out.add(node.var_name)
+    if isinstance(node, list):
+        for x in node:
+            _assigned_names(x, out)
+    elif isinstance(node, Node):
+        for k in node.__dataclass_fields__:
+            v = getattr(node, k)
+            if isinstance(v, (Node, list)):
+                _assigned_names(v, out)
+
+def unroll_trips(st: ForStmt, limit: int) -> Optional[int]:
+    """Trip count of a for loop worth unrolling, or None.
+
+    Only loops with literal bounds, at most `limit` trips, no inner loops
+    and a body that never writes the loop variable qualify.
+    """
+    if not (isinstance(st.start, Number) and isinstance(st.end, Number)):
+        return None
+    trips = max(0, st.end.value - st.start.value)
+    if trips > limit:
+        return None
+    for x in st.body.statements:
+        if isinstance(x, (WhileStmt, DoWhileStmt, ForStmt, FunctionDef)):
+            return None
+    names = set()
+    _assigned_names(st.body, names)
+    if st.var_name in names:
+        return None
+    return trips
+
+def _has_nested_assign(e: Expr) -> bool:
+    s = set()
+    _assigned_names(e, s)
+    return bool(s)
+
+class _Occ:
+    __slots__ = ("node", "holder", "field", "stmt", "size")
+
+    def __init__(self, node, holder, field, stmt, size):
+        self.node = node
+        self.holder = holder
+        self.field = field
+        self.stmt = stmt
+        self.size = size
+
+def _collect(e, holder, field, stmt: int, ver: Dict[str, int], occs: Dict[tuple, List[_Occ]]) -> Tuple[Optional[tuple], int]:
+    """Value-number e; record every pure operator node under its key."""
+    if isinstance(e, Number):
+        return ("n", e.value), 1
+    if isinstance(e, Identifier):
+        return ("v", e.name, ver.get(e.name, 0)), 1
+    if isinstance(e, BinaryOp):
+        kl, sl = _collect(e.left, e, "left", stmt, ver, occs)
+        kr, sr = _collect(e.right, e, "right", stmt, ver, occs)
+        # division is left alone: hoisting it could move a trap before a call
+        if kl is None or kr is None or e.op == "/":
+            return None, 0
+        key = (e.op, kl, kr)
+        size = sl + sr + 1
+    elif isinstance(e, UnaryOp):
+        k, s = _collect(e.operand, e, "operand", stmt, ver, occs)
+        if k is None:
+            return None, 0
+        key = ("u" + e.op, k)
+        size = s + 1
+    else:
+        if isinstance(e, Call):
+            for i, a in enumerate(e.args):
+                _collect(a, e.args, i, stmt, ver, occs)
+        elif isinstance(e, Assign):
+            _collect(e.value, e, "value", stmt, ver, occs)
+        return None, 0
+    occs.setdefault(key, []).append(_Occ(e, holder, field, stmt, size))
+    return key, size
+
+def _subtree_ids(e, out: set):
+    out.add(id(e))
+    if isinstance(e, Node):
+        for k in e.__dataclass_fields__:
+            v = getattr(e, k)
+            if isinstance(v, Node):
+                _subtree_ids(v, out)
+            elif isinstance(v, list):
+                for x in v:
+                    _subtree_ids(x, out)
+
+def _replace(occ: _Occ, new: Expr):
+    if isinstance(occ.holder, list):
+        occ.holder[occ.field] = new
+    else:
+        setattr(occ.holder, occ.field, new)
+
+def cse(block: Block, counter: Optional[List[int]] = None):
+    """Common-subexpression elimination over each straight-line run of block."""
+    if counter is None:
+        counter = [0]
+    ver: Dict[str, int] = {}
+    occs: Dict[tuple, List[_Occ]] = {}
+
+    def bump(names):
+        for n in names:
+            ver[n] = ver.get(n, 0) + 1
+
+    for i, st in enumerate(block.statements):
+        if isinstance(st, VarDecl):
+            if st.init is not None and not _has_nested_assign(st.init):
+                _collect(st.init, st, "init", i, ver, occs)
+            bump([st.name])
+        elif isinstance(st, ExprStmt):
+            e = st.expr
+            inner = e.value if isinstance(e, Assign) else e
+            names = set()
+            _assigned_names(e, names)
+            if not _has_nested_assign(inner):
+                _collect(inner, e if inner is not e else st, "value" if inner is not e else "expr", i, ver, occs)
+            bump(names)
+        elif isinstance(st, Return):
+            if st.value is not None and not _has_nested_assign(st.value):
+                _collect(st.value, st, "value", i, ver, occs)
+        else:
+            names = set()
+            _assigned_names(st, names)
+            bump(names)
+            if isinstance(st, IfStmt):
+                cse(st.then_block, counter)
+                if st.else_block:
+                    cse(st.else_block, counter)
+            elif isinstance(st, (WhileStmt, DoWhileStmt, ForStmt)):
+                cse(st.body, counter)
+            elif isinstance(st, Block):
+                cse(st, counter)
+            elif isinstance(st, FunctionDef) and st.body is not None:
+                cse(st.body, [0])
+
+    # biggest expressions first, so a repeated `a*b+c` wins over its `a*b`
+    dead: set = set()
+    inserts: Dict[int, List[VarDecl]] = {}
+    for key, lst in sorted(occs.items(), key=lambda kv: -kv[1][0].size):
+        live = [o for o in lst if id(o.node) not in dead]
+        if len(live) < 2:
+            continue
+        counter[0] += 1
+        name = f"$cse{counter[0]}"
+        first = live[0]
+        decl = VarDecl(
+            name=name,
+            type_name="bool" if first.node.op in _BOOL_OPS else "int",
+            init=first.node,
+            line=first.node.line,
+            column=first.node.column,
+        )
+        inserts.setdefault(first.stmt, []).append(decl)
+        for o in live:
+            _subtree_ids(o.node, dead)
+            _replace(o, Identifier(name=name, line=o.node.line, column=o.node.column))
+
+    if inserts:
+        out: List[Stmt] = []
+        for i, st in enumerate(block.statements):
+            out.extend(inserts.get(i, ()))
+            out.append(st)
+        block.statements = out
+
+def optimize_function(fn: FunctionDef) -> FunctionDef:
+    """Fold + CSE fn in place and return it.
+
+    The code generator lowers the result straight away and drops it, so
+    the tree is not copied first; a caller that still needs the original
+    must copy it.
+    """
+    _fold_function(fn)
+    if fn.body is not None:
+        cse(fn.body)
+    return fn
+
+def optimize(prog: Program) -> Program:
+    """optimize_function applied in place to every function of prog."""
+    for fn in prog.functions:
+        if isinstance(fn, FunctionDef):
+            optimize_function(fn)
+    return prog
@@ -0,0 +1,235 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, List, Tuple
+from ast_nodes import *
+from ast_opt import unroll_trips
+
+# Flat bytecode the TSVM code generator consumes instead of walking the AST.
+# Every instruction is two ints, (opcode, arg); arg is an index into the
+# constants table (names, literal values, call signatures) or 0 if unused.
+# Expressions are in postfix order; control flow is bracketed by *_BEGIN /
+# *_END markers so the generator can keep its label/scope stack.
+
+(
+    PROC,           # arg: (name, param names)     start a proc
+    END_PROC,       # arg: 1 = append default return
+    PUSH_NUM,       # arg: int literal
+    LOAD_VAR,       # arg: name
+    STORE_VAR,      # arg: name                    Assign: pop value, push target
+    ADD, SUB, MUL, DIV,
+    LT, GT, EQ, NEQ, LE, GE,
+    AND_THEN,       # pop left; skip the right operand if it is 0
+    OR_ELSE,        # pop left; skip the right operand if it is not 0
+    LOGIC_END,      # pop right; push the result of && / ||
+    BINOP_OTHER,    # arg: operator text           no TSVM equivalent
+    NEG, POS, NOT,
+    CALL,           # arg: (name, argc)
+    SCAN,
+    PRINT,          # arg: 1 if a value was pushed
+    PUSH_ZERO,      # unsupported expression
+    POP,
+    VAR_BIND,       # arg: name
+    VAR_INIT,       # arg: name                    pop initializer
+    RET,            # pop value into r0
+    RET_VOID,
+    IF_BEGIN,       # arg: 1 if there is an else block
+    IF_THEN,        # pop condition
+    IF_ELSE,
+    IF_END,
+    WHILE_BEGIN,
+    WHILE_TEST,     # pop condition
+    WHILE_END,
+    DO_BEGIN,
+    DO_TEST,        # leave the body scope before the condition
+    DO_END,         # pop condition
+    FOR_BIND,       # arg: loop variable name
+    FOR_BEGIN,      # arg: loop variable name      pop end, pop start
+    FOR_END,
+    SCOPE_BEGIN,    # open a nested scope (one unrolled loop iteration)
+    SCOPE_END,
+) = range(46)
+
+NUM_OPCODES = 46
+
+# for loops with literal bounds and at most this many trips are unrolled
+UNROLL_LIMIT = 8
+
+BINOP_OPCODES = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV,
+    "<": LT, ">": GT, "==": EQ, "!=": NEQ,
+    "<=": LE, ">=": GE,
+}
+
+# && and || short-circuit, so they are bracketed instead of postfix
+LOGIC_OPCODES = {"&&": AND_THEN, "||": OR_ELSE}
+
+UNOP_OPCODES = {"-": NEG, "+": POS, "!": NOT}
+
+class Lowering:
+    """Lower a Program into (code, consts) in a single walk."""
+
+    def __init__(self):
+        self.code = array("i")
+        self.consts: List[Any] = []
+        self._const_ids: Dict[Tuple[type, Any], int] = {}
+
+    def const(self, value: Any) -> int:
+        key = (type(value), value)
+        idx = self._const_ids.get(key)
+        if idx is None:
+            idx = len(self.consts)
+            self.consts.append(value)
+            self._const_ids[key] = idx
+        return idx
+
+    def op(self, opcode: int, arg: int = 0):
+        self.code.append(opcode)
+        self.code.append(arg)
+
+    def lower_program(self, prog: Program) -> Tuple[array, List[Any]]:
+        for fn in prog.functions:
+            if isinstance(fn, FunctionDef):
+                self.lower_function(fn)
+        return self.code, self.consts
+
+    def lower_function(self, fn: FunctionDef):
+        self.op(PROC, self.const((fn.name, tuple(p.name for p in fn.params))))
+
+        if fn.arrow_return_expr is not None:
+            self.lower_expr(fn.arrow_return_expr)
+            self.op(RET)
+            self.op(END_PROC, 0)
+            return
+
+        nested = []
+        if fn.body is not None:
+            nested = [st for st in fn.body.statements if isinstance(st, FunctionDef)]
+            self.lower_block(fn.body)
+        self.op(END_PROC, 1)
+
+        # nested functions become procs of their own, after the parent
+        for st in nested:
+            self.lower_function(st)
+
+    # ---------- statements ----------
+    def lower_block(self, block: Block):
+        for st in block.statements:
+            self.lower_stmt(st)
+
+    def lower_stmt(self, st: Stmt):
+        t = type(st)
+        if t is VarDecl:
+            name = self.const(st.name)
+            self.op(VAR_BIND, name)
+            if st.init is not None:
+                self.lower_expr(st.init)
+                self.op(VAR_INIT, name)
+        elif t is ExprStmt:
+            self.lower_expr(st.expr)
+            self.op(POP)
+        elif t is Assign:
+            self.lower_expr(st)
+            self.op(POP)
+        elif t is Return:
+            if st.value is None:
+                self.op(RET_VOID)
+            else:
+                self.lower_expr(st.value)
+                self.op(RET)
+        elif t is IfStmt:
+            self.op(IF_BEGIN, 1 if st.else_block else 0)
+            self.lower_expr(st.cond)
+            self.op(IF_THEN)
+            self.lower_block(st.then_block)
+            if st.else_block:
+                self.op(IF_ELSE)
+                self.lower_block(st.else_block)
+            self.op(IF_END)
+        elif t is WhileStmt:
+            self.op(WHILE_BEGIN)
+            self.lower_expr(st.cond)
+            self.op(WHILE_TEST)
+            self.lower_block(st.body)
+            self.op(WHILE_END)
+        elif t is DoWhileStmt:
+            self.op(DO_BEGIN)
+            self.lower_block(st.body)
+            self.op(DO_TEST)
+            self.lower_expr(st.cond)
+            self.op(DO_END)
+        elif t is ForStmt:
+            var = self.const(st.var_name)
+            self.op(FOR_BIND, var)
+            trips = unroll_trips(st, UNROLL_LIMIT)
+            if trips is not None:
+                # one copy of the body per value of the loop variable
+                first = st.start.value
+                for k in range(first, first + trips):
+                    self.store_const(var, k)
+                    self.op(SCOPE_BEGIN)
+                    self.lower_block(st.body)
+                    self.op(SCOPE_END)
+                self.store_const(var, first + trips)
+                return
+            self.lower_expr(st.start)
+            self.lower_expr(st.end)
+            self.op(FOR_BEGIN, var)
+            self.lower_block(st.body)
+            self.op(FOR_END)
+        # anything else (nested FunctionDef, already hoisted) emits nothing
+
+    def store_const(self, name: int, value: int):
+        self.op(PUSH_NUM, self.const(value))
+        self.op(STORE_VAR, name)
+        self.op(POP)
+
+    # ---------- expressions ----------
+    def lower_expr(self, e: Expr):
+        t = type(e)
+        if t is Number:
+            self.op(PUSH_NUM, self.const(e.value))
+        elif t is Identifier:
+            self.op(LOAD_VAR, self.const(e.name))
+        elif t is Assign:
+            self.lower_expr(e.value)
+            self.op(STORE_VAR, self.const(e.target.name))
+        elif t is BinaryOp and e.op in LOGIC_OPCODES:
+            self.lower_expr(e.left)
+            self.op(LOGIC_OPCODES[e.op])
+            self.lower_expr(e.right)
+            self.op(LOGIC_END)
+        elif t is BinaryOp:
+            self.lower_expr(e.left)
+            self.lower_expr(e.right)
+            opcode = BINOP_OPCODES.get(e.op)
+            if opcode is None:
+                self.op(BINOP_OTHER, self.const(e.op))
+            else:
+                self.op(opcode)
+        elif t is UnaryOp:
+            self.lower_expr(e.operand)
+            self.op(UNOP_OPCODES.get(e.op, POS))
+        elif t is Call:
+            fname = e.func.name
+            if fname == "scan":
+                self.op(SCAN)
+            elif fname == "print":
+                # only the first argument is printed
+                if e.args:
+                    self.lower_expr(e.args[0])
+                self.op(PRINT, 1 if e.args else 0)
+            else:
+                for a in e.args:
+                    self.lower_expr(a)
+                self.op(CALL, self.const((fname, len(e.args))))
+        else:
+            self.op(PUSH_ZERO)
+
+def lower(prog: Program) -> Tuple[array, List[Any]]:
+    return Lowering().lower_program(prog)
+
+def lower_function(fn: FunctionDef) -> Tuple[array, List[Any]]:
+    """Tape for one function (and the functions nested in it) on its own."""
+    low = Lowering()
+    low.lower_function(fn)
+    return low.code, low.consts
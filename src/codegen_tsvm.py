@@ -1,287 +1,454 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from collections import ChainMap
+from typing import Callable, Dict, List, Optional
 from ast_nodes import *
-
-@dataclass
-class GenResult:
-    code: str
+from regalloc import allocate, LABEL, COMMENT
+from peephole import peephole
+from ast_opt import optimize_function
+import bytecode as bc
 
 class TSVMCodeGen:
-    def __init__(self):
-        self.lines: List[str] = []
+    # binary opcode -> TSVM mnemonic
+    _OPMAP = {
+        bc.ADD: "add", bc.SUB: "sub", bc.MUL: "mul", bc.DIV: "div",
+        bc.LT: "lt", bc.GT: "gt", bc.EQ: "eq", bc.NEQ: "neq",
+        bc.LE: "le", bc.GE: "ge",
+    }
 
-    def emit(self, s: str):
-        self.lines.append(s)
+    def __init__(self):
+        # Finished procs are streamed into `out`; `lines` only buffers the
+        # instruction tuples (see regalloc) of the proc being generated
+        # until register allocation.
+        self.out = bytearray()
+        self.lines: List[tuple] = []
+        # Opcode -> handler. Each handler gets the instruction's arg.
+        self._handlers: List[Optional[Callable[[int], None]]] = [None] * bc.NUM_OPCODES
+        for opcode, handler in (
+            (bc.PROC, self._op_proc),
+            (bc.END_PROC, self._op_end_proc),
+            (bc.PUSH_NUM, self._op_push_num),
+            (bc.LOAD_VAR, self._op_load_var),
+            (bc.STORE_VAR, self._op_store_var),
+            (bc.AND_THEN, self._op_and_then),
+            (bc.OR_ELSE, self._op_or_else),
+            (bc.LOGIC_END, self._op_logic_end),
+            (bc.BINOP_OTHER, self._op_binop_other),
+            (bc.NEG, self._op_neg),
+            (bc.POS, self._op_pos),
+            (bc.NOT, self._op_not),
+            (bc.CALL, self._op_call),
+            (bc.SCAN, self._op_scan),
+            (bc.PRINT, self._op_print),
+            (bc.PUSH_ZERO, self._op_push_zero),
+            (bc.POP, self._op_pop),
+            (bc.VAR_BIND, self._op_var_bind),
+            (bc.VAR_INIT, self._op_var_init),
+            (bc.RET, self._op_ret),
+            (bc.RET_VOID, self._op_ret_void),
+            (bc.IF_BEGIN, self._op_if_begin),
+            (bc.IF_THEN, self._op_if_then),
+            (bc.IF_ELSE, self._op_if_else),
+            (bc.IF_END, self._op_if_end),
+            (bc.WHILE_BEGIN, self._op_while_begin),
+            (bc.WHILE_TEST, self._op_while_test),
+            (bc.WHILE_END, self._op_while_end),
+            (bc.DO_BEGIN, self._op_do_begin),
+            (bc.DO_TEST, self._op_do_test),
+            (bc.DO_END, self._op_do_end),
+            (bc.FOR_BIND, self._op_for_bind),
+            (bc.FOR_BEGIN, self._op_for_begin),
+            (bc.FOR_END, self._op_for_end),
+            (bc.SCOPE_BEGIN, self._op_scope_begin),
+            (bc.SCOPE_END, self._op_scope_end),
+        ):
+            self._handlers[opcode] = handler
+        for opcode in self._OPMAP:
+            self._handlers[opcode] = self._binop_handler(opcode)
+
+    def emit(self, *ins):
+        self.lines.append(ins)
 
     def generate(self, prog: Program) -> str:
-        self.lines = []
+        self.begin()
         for fn in prog.functions:
             if isinstance(fn, FunctionDef):
-                self.gen_function(fn)
-        return "\n".join(self.lines).strip() + "\n"
+                self.generate_function(fn)
+        return self.finish()
 
-    def gen_function(self, fn: FunctionDef):
-        self.emit(f"proc {fn.name}")
+    def begin(self):
+        """Reset the output; generate_function then appends one function at a time."""
+        self.out = bytearray()
+        self.lines = []
+        self.env: Optional[RegEnv] = None
+        self.nparams = 0
+        # value number -> register holding it, for the current basic block.
+        # Cleared at every label/jump and whenever a variable is written.
+        self._expr_cache: Dict[tuple, int] = {}
+        # register stack for expression values, saved envs for nested
+        # scopes, and per-statement control data (labels, loop registers)
+        self.stack: List[int] = []
+        self.scopes: List[RegEnv] = []
+        self.ctl: List[tuple] = []
+
+    def generate_function(self, fn: FunctionDef):
+        # fn is optimized in place; the tape only lives for this call
+        code, self.consts = bc.lower_function(optimize_function(fn))
+        handlers = self._handlers
+        pc, n = 0, len(code)
+        while pc < n:
+            handlers[code[pc]](code[pc + 1])
+            pc += 2
+
+    def finish(self) -> str:
+        return self.out.decode().strip() + "\n"
+
+    def _enter_scope(self):
+        self.scopes.append(self.env)
+        self.env = self.env.child()
+
+    def _leave_scope(self):
+        self.env = self.scopes.pop()
+
+    # -------- procs ----------
+    def _op_proc(self, arg: int):
+        name, params = self.consts[arg]
+        self.out += b"proc %s\n" % name.encode()
+        # Body lines are emitted on virtual registers and rewritten onto
+        # physical ones by the allocator once the proc is complete.
+        self.lines = []
+        self.nparams = len(params)
         
         # Initialize environment with a shared register counter starting at 1
         # r0 is reserved for return values.
-        env = RegEnv(start_reg=1)
+        self.env = RegEnv(start_reg=1)
         
         # Bind parameters to registers (r1, r2, ...)
-        for i, p in enumerate(fn.params, start=1):
-            reg = env.new_reg() 
-            env.bind(p.name, reg)
-
-        # Handle arrow functions (single expression return)
-        if fn.arrow_return_expr is not None:
-            r = self.gen_expr(fn.arrow_return_expr, env)
-            self.emit(f"    mov r0, {r}")
-            self.emit("    ret")
-            self.emit("") 
-            return
-
-        # Pre-scan for nested functions to hoist them later
-        nested_functions = []
-        if fn.body is not None:
-            for st in fn.body.statements:
-                if isinstance(st, FunctionDef):
-                    nested_functions.append(st)
-
-        # Generate body code
-        if fn.body is not None:
-            self.gen_block(fn.body, env)
-
-        # Default return 0  , if no explicit return found 
-        self.emit("    mov r0, 0")
-        self.emit("    ret")
-        self.emit("")
-
-        # Generate nested functions AFTER the parent function has closed
-        for nested in nested_functions:
-            self.gen_function(nested)
-
-    def gen_block(self, block: Block, env: "RegEnv"):
-        for st in block.statements:
-            if isinstance(st, VarDecl):
-                # Allocate a register for the variable if not already bound
-                if not env.has(st.name):
-                    env.bind(st.name, env.new_reg())
-                
-                if st.init is not None:
-                    r = self.gen_expr(st.init, env)
-                    self.emit(f"    mov {env.get(st.name)}, {r}")
-
-            elif isinstance(st, ExprStmt):
-                self.gen_expr(st.expr, env)
-
-            elif isinstance(st, Assign):
-                self.gen_expr(st, env)
-
-            elif isinstance(st, Return):
-                if st.value is None:
-                    self.emit("    mov r0, 0")
-                else:
-                    r = self.gen_expr(st.value, env)
-                    self.emit(f"    mov r0, {r}")
-                self.emit("    ret")
-
-            elif isinstance(st, IfStmt):
-                self.gen_if(st, env)
-
-            elif isinstance(st, WhileStmt):
-                self.gen_while(st, env)
-
-            elif isinstance(st, DoWhileStmt):
-                self.gen_do_while(st, env)
-
-            elif isinstance(st, ForStmt):
-                self.gen_for(st, env)
-
-            elif isinstance(st, FunctionDef):
-                # Nested function already handled in generate()
-                pass
-
-    def gen_if(self, st: IfStmt, env: "RegEnv"):
-        lbl_else = env.new_label("else")
-        lbl_end = env.new_label("endif")
-        cond_r = self.gen_expr(st.cond, env)
-        
-        target = lbl_else if st.else_block else lbl_end
-        self.emit(f"    jz {cond_r}, {target}")
-        
-        self.gen_block(st.then_block, env.child())
-        
-        if st.else_block:
-            self.emit(f"    jmp {lbl_end}")
-            self.emit(f"{lbl_else}:")
-            self.gen_block(st.else_block, env.child())
-            
-        self.emit(f"{lbl_end}:")
-
-    def gen_while(self, st: WhileStmt, env: "RegEnv"):
-        lbl_start = env.new_label("while")
-        lbl_end = env.new_label("endwhile")
-        
-        self.emit(f"{lbl_start}:")
-        cond_r = self.gen_expr(st.cond, env)
-        self.emit(f"    jz {cond_r}, {lbl_end}")
-        
-        self.gen_block(st.body, env.child())
-        self.emit(f"    jmp {lbl_start}")
-        self.emit(f"{lbl_end}:")
-
-    def gen_do_while(self, st: DoWhileStmt, env: "RegEnv"):
-        lbl_start = env.new_label("do")
-        self.emit(f"{lbl_start}:")
-        
-        self.gen_block(st.body, env.child())
-        
-        cond_r = self.gen_expr(st.cond, env)
-        self.emit(f"    jnz {cond_r}, {lbl_start}")
+        for p in params:
+            self.env.bind(p, self.env.new_reg())
+        self._expr_cache.clear()
+
+    def _op_end_proc(self, arg: int):
+        if arg:
+            # Default return 0  , if no explicit return found 
+            self.emit("mov", 0, b"0")
+            self.emit("ret")
+        out = self.out
+        for ins in peephole(allocate(self.lines, self.nparams)):
+            out += _template(ins) % ins[1:]
+        out += b"\n"
+        self.lines = []
 
-    def gen_for(self, st: ForStmt, env: "RegEnv"):
+    # -------- statements ----------
+    def _op_var_bind(self, arg: int):
+        # Allocate a register for the variable if not already bound
+        name = self.consts[arg]
+        if not self.env.has(name):
+            self.env.bind(name, self.env.new_reg())
+
+    def _op_var_init(self, arg: int):
+        r = self.stack.pop()
+        self.emit("mov", self.env.get(self.consts[arg]), r)
+        self._expr_cache.clear()
+
+    def _op_pop(self, arg: int):
+        self.stack.pop()
+
+    def _op_ret(self, arg: int):
+        self.emit("mov", 0, self.stack.pop())
+        self.emit("ret")
+        self._expr_cache.clear()
+
+    def _op_ret_void(self, arg: int):
+        self.emit("mov", 0, b"0")
+        self.emit("ret")
+        self._expr_cache.clear()
+
+    def _op_if_begin(self, arg: int):
+        lbl_else = self.env.new_label(b"else")
+        lbl_end = self.env.new_label(b"endif")
+        self.ctl.append((lbl_else if arg else lbl_end, lbl_end))
+
+    def _op_if_then(self, arg: int):
+        target, _ = self.ctl[-1]
+        self.emit("jz", self.stack.pop(), target)
+        self._enter_scope()
+        self._expr_cache.clear()
+
+    def _op_if_else(self, arg: int):
+        lbl_else, lbl_end = self.ctl[-1]
+        self._leave_scope()
+        self.emit("jmp", lbl_end)
+        self.emit(LABEL, lbl_else)
+        self._enter_scope()
+        self._expr_cache.clear()
+
+    def _op_if_end(self, arg: int):
+        _, lbl_end = self.ctl.pop()
+        self._leave_scope()
+        self.emit(LABEL, lbl_end)
+        self._expr_cache.clear()
+
+    def _op_while_begin(self, arg: int):
+        lbl_start = self.env.new_label(b"while")
+        lbl_end = self.env.new_label(b"endwhile")
+        self.ctl.append((lbl_start, lbl_end))
+        self.emit(LABEL, lbl_start)
+        self._expr_cache.clear()
+
+    def _op_while_test(self, arg: int):
+        _, lbl_end = self.ctl[-1]
+        self.emit("jz", self.stack.pop(), lbl_end)
+        self._enter_scope()
+        self._expr_cache.clear()
+
+    def _op_while_end(self, arg: int):
+        lbl_start, lbl_end = self.ctl.pop()
+        self._leave_scope()
+        self.emit("jmp", lbl_start)
+        self.emit(LABEL, lbl_end)
+        self._expr_cache.clear()
+
+    def _op_do_begin(self, arg: int):
+        lbl_start = self.env.new_label(b"do")
+        self.ctl.append((lbl_start,))
+        self.emit(LABEL, lbl_start)
+        self._enter_scope()
+        self._expr_cache.clear()
+
+    def _op_do_test(self, arg: int):
+        # the condition is evaluated in the enclosing scope
+        self._leave_scope()
+
+    def _op_do_end(self, arg: int):
+        (lbl_start,) = self.ctl.pop()
+        self.emit("jnz", self.stack.pop(), lbl_start)
+        self._expr_cache.clear()
+
+    def _op_for_bind(self, arg: int):
         # for(i = start to end) ... : i assumed int
-        if not env.has(st.var_name):
-            env.bind(st.var_name, env.new_reg())
-            
-        ireg = env.get(st.var_name)
-        sreg = self.gen_expr(st.start, env)
-        ereg = self.gen_expr(st.end, env)
+        name = self.consts[arg]
+        if not self.env.has(name):
+            self.env.bind(name, self.env.new_reg())
+
+    def _op_for_begin(self, arg: int):
+        env = self.env
+        ireg = env.get(self.consts[arg])
+        ereg = self.stack.pop()
+        sreg = self.stack.pop()
         
-        self.emit(f"    mov {ireg}, {sreg}")
+        self.emit("mov", ireg, sreg)
+        # the step is loop invariant: materialize it once, before the loop
+        one = env.new_reg()
+        self.emit("mov", one, b"1")
         
-        lbl_start = env.new_label("for")
-        lbl_end = env.new_label("endfor")
+        lbl_start = env.new_label(b"for")
+        lbl_end = env.new_label(b"endfor")
         
-        self.emit(f"{lbl_start}:")
+        self.emit(LABEL, lbl_start)
         
         # condition: i < end
         tmp = env.new_reg()
-        self.emit(f"    lt {tmp}, {ireg}, {ereg}")
-        self.emit(f"    jz {tmp}, {lbl_end}")
-        
-        self.gen_block(st.body, env.child())
-        
+        self.emit("lt", tmp, ireg, ereg)
+        self.emit("jz", tmp, lbl_end)
+        self.ctl.append((ireg, one, lbl_start, lbl_end))
+        self._enter_scope()
+        self._expr_cache.clear()
+
+    def _op_for_end(self, arg: int):
+        ireg, one, lbl_start, lbl_end = self.ctl.pop()
+        self._leave_scope()
         # i = i + 1
-        one = env.new_reg()
-        self.emit(f"    mov {one}, 1")
-        tmp2 = env.new_reg()
-        self.emit(f"    add {tmp2}, {ireg}, {one}")
-        self.emit(f"    mov {ireg}, {tmp2}")
-        self.emit(f"    jmp {lbl_start}")
+        self.emit("add", ireg, ireg, one)
+        self.emit("jmp", lbl_start)
         
-        self.emit(f"{lbl_end}:")
+        self.emit(LABEL, lbl_end)
+        self._expr_cache.clear()
 
-    # -------- expressions ----------
-    def gen_expr(self, e: Expr, env: "RegEnv") -> str:
-        if isinstance(e, Number):
-            r = env.new_reg()
-            self.emit(f"    mov {r}, {e.value}")
-            return r
-            
-        if isinstance(e, Identifier):
-            return env.get(e.name, default="r0")
-            
-        if isinstance(e, Assign):
-            rhs = self.gen_expr(e.value, env)
-            target = e.target.name
-            if not env.has(target):
-                env.bind(target, env.new_reg())
-            self.emit(f"    mov {env.get(target)}, {rhs}")
-            return env.get(target)
-            
-        if isinstance(e, BinaryOp):
-            l = self.gen_expr(e.left, env)
-            r = self.gen_expr(e.right, env)
-            out = env.new_reg()
-            
-            opmap = {
-                "+": "add", "-": "sub", "*": "mul", "/": "div",
-                "<": "lt", ">": "gt", "==": "eq", "!=": "neq",
-                "<=": "le", ">=": "ge", "&&": "and", "||": "or",
-            }
-            ins = opmap.get(e.op)
-            if not ins:
-                self.emit(f"    # unsupported op {e.op}")
-                self.emit(f"    mov {out}, {l}")
-                return out
-                
-            self.emit(f"    {ins} {out}, {l}, {r}")
-            return out
-            
-        if isinstance(e, UnaryOp):
-            x = self.gen_expr(e.operand, env)
-            out = env.new_reg()
-            
-            if e.op == "-":
-                zero = env.new_reg()
-                self.emit(f"    mov {zero}, 0")
-                self.emit(f"    sub {out}, {zero}, {x}")
-            elif e.op == "+":
-                self.emit(f"    mov {out}, {x}")
-            elif e.op == "!":
-                self.emit(f"    not {out}, {x}")
-            else:
-                self.emit(f"    mov {out}, {x}")
-            return out
-            
-        if isinstance(e, Call):
-            fname = e.func.name
-            
-            if fname == "scan":
-                out = env.new_reg()
-                self.emit(f"    call read, {out}")
-                return out
-                
-            if fname == "print":
-                # print(x) => call log, xreg
-                if e.args:
-                    x = self.gen_expr(e.args[0], env)
-                    self.emit(f"    call log, {x}")
-                return "r0"
-                
-            
-            out = env.new_reg()
-            arg_regs = [self.gen_expr(a, env) for a in e.args]
-            args_str = ", ".join([out] + arg_regs)
-            self.emit(f"    call {fname}, {args_str}")
-            return out
+    def _op_scope_begin(self, arg: int):
+        self._enter_scope()
 
-        
-        out = env.new_reg()
-        self.emit(f"    mov {out}, 0")
-        return out
+    def _op_scope_end(self, arg: int):
+        self._leave_scope()
 
-class RegEnv:
-    def __init__(self, start_reg=1, shared_counter=None):
-        self.var2reg: Dict[str, str] = {}
-        # Use a list to simulate a mutable integer reference shared across scopes
-        if shared_counter is None:
-            self.reg_counter = [start_reg]
+    # -------- expressions ----------
+    def _op_push_num(self, arg: int):
+        key = (bc.PUSH_NUM, arg)
+        r = self._expr_cache.get(key)
+        if r is None:
+            r = self.env.new_reg()
+            self.emit("mov", r, b"%d" % self.consts[arg])
+            self._expr_cache[key] = r
+        self.stack.append(r)
+
+    def _op_load_var(self, arg: int):
+        self.stack.append(self.env.get(self.consts[arg], default=0))
+
+    def _op_store_var(self, arg: int):
+        env = self.env
+        rhs = self.stack.pop()
+        target = self.consts[arg]
+        if not env.has(target):
+            env.bind(target, env.new_reg())
+        self.emit("mov", env.get(target), rhs)
+        self.stack.append(env.get(target))
+        self._expr_cache.clear()
+
+    def _binop_handler(self, opcode: int) -> Callable[[int], None]:
+        ins = self._OPMAP[opcode]
+
+        def handler(arg: int):
+            stack = self.stack
+            r = stack.pop()
+            l = stack.pop()
+            key = (opcode, l, r)
+            out = self._expr_cache.get(key)
+            if out is None:
+                out = self.env.new_reg()
+                self.emit(ins, out, l, r)
+                self._expr_cache[key] = out
+            stack.append(out)
+        return handler
+
+    def _short_circuit(self, jump: str):
+        # out = left; the right operand only runs if left did not decide it
+        out = self.env.new_reg()
+        lbl_end = self.env.new_label(b"endlogic")
+        self.emit("mov", out, self.stack.pop())
+        self.emit(jump, out, lbl_end)
+        self.ctl.append((out, lbl_end))
+
+    def _op_and_then(self, arg: int):
+        self._short_circuit("jz")
+
+    def _op_or_else(self, arg: int):
+        self._short_circuit("jnz")
+
+    def _op_logic_end(self, arg: int):
+        out, lbl_end = self.ctl.pop()
+        self.emit("mov", out, self.stack.pop())
+        self.emit(LABEL, lbl_end)
+        self.stack.append(out)
+        # values computed by the right operand may not have been
+        self._expr_cache.clear()
+
+    def _op_binop_other(self, arg: int):
+        self.stack.pop()
+        l = self.stack.pop()
+        out = self.env.new_reg()
+        self.emit(COMMENT, b"unsupported op %s" % self.consts[arg].encode())
+        self.emit("mov", out, l)
+        self.stack.append(out)
+
+    def _op_neg(self, arg: int):
+        x = self.stack.pop()
+        key = (bc.NEG, x)
+        out = self._expr_cache.get(key)
+        if out is None:
+            out = self.env.new_reg()
+            zero = self.env.new_reg()
+            self.emit("mov", zero, b"0")
+            self.emit("sub", out, zero, x)
+            self._expr_cache[key] = out
+        self.stack.append(out)
+
+    def _op_pos(self, arg: int):
+        x = self.stack.pop()
+        out = self.env.new_reg()
+        self.emit("mov", out, x)
+        self.stack.append(out)
+
+    def _op_not(self, arg: int):
+        x = self.stack.pop()
+        key = (bc.NOT, x)
+        out = self._expr_cache.get(key)
+        if out is None:
+            out = self.env.new_reg()
+            self.emit("not", out, x)
+            self._expr_cache[key] = out
+        self.stack.append(out)
+
+    def _op_call(self, arg: int):
+        fname, argc = self.consts[arg]
+        if argc:
+            arg_regs = self.stack[-argc:]
+            del self.stack[-argc:]
+        else:
+            arg_regs = []
+        out = self.env.new_reg()
+        self.emit("call", fname.encode(), out, *arg_regs)
+        self.stack.append(out)
+
+    def _op_scan(self, arg: int):
+        out = self.env.new_reg()
+        self.emit("call", b"read", out)
+        self.stack.append(out)
+
+    def _op_print(self, arg: int):
+        # print(x) => call log, xreg
+        if arg:
+            self.emit("call", b"log", self.stack.pop())
+        self.stack.append(0)
+
+    def _op_push_zero(self, arg: int):
+        out = self.env.new_reg()
+        self.emit("mov", out, b"0")
+        self.stack.append(out)
+
+# (op, operand types) -> bytes template that prints one instruction line
+_TEMPLATES: Dict[tuple, bytes] = {}
+
+def _template(ins: tuple) -> bytes:
+    key = (ins[0], *map(type, ins))
+    t = _TEMPLATES.get(key)
+    if t is None:
+        op = ins[0]
+        if op == LABEL:
+            t = b"%s:\n"
+        elif op == COMMENT:
+            t = b"    # %s\n"
         else:
-            self.reg_counter = shared_counter
-            
-        self.label_id = 0
+            args = b", ".join(b"r%d" if type(x) is int else b"%s" for x in ins[1:])
+            t = b"    " + op.encode() + (b" " + args if args else b"") + b"\n"
+        _TEMPLATES[key] = t
+    return t
 
-    def new_reg(self) -> str:
+class _ProcCounters:
+    # Next free register and label id, shared by every scope of one proc
+    __slots__ = ("next_reg", "next_label")
+
+    def __init__(self, start_reg: int):
+        self.next_reg = start_reg
+        self.next_label = 0
+
+class RegEnv:
+    __slots__ = ("var2reg", "counters")
+
+    def __init__(self, start_reg=1, counters: Optional[_ProcCounters]=None):
+        # variable -> register number; registers are only spelled "rN"
+        # when an instruction is emitted. Child scopes layer their own
+        # bindings over the parent's instead of copying them.
+        self.var2reg: ChainMap[str, int] = ChainMap()
+        # Sibling and nested scopes share one counter object, so a register
+        # or label is never handed out twice within a proc
+        self.counters = _ProcCounters(start_reg) if counters is None else counters
+
+    def new_reg(self) -> int:
         # Allocate next free register from the shared counter
-        r = f"r{self.reg_counter[0]}"
-        self.reg_counter[0] += 1
+        c = self.counters
+        r = c.next_reg
+        c.next_reg += 1
         return r
 
-    def bind(self, name: str, reg: str):
+    def bind(self, name: str, reg: int):
         self.var2reg[name] = reg
         
-        if reg.startswith('r') and reg[1:].isdigit():
-            val = int(reg[1:])
-            if val >= self.reg_counter[0]:
-                self.reg_counter[0] = val + 1
+        if reg >= self.counters.next_reg:
+            self.counters.next_reg = reg + 1
 
     def has(self, name: str) -> bool:
         return name in self.var2reg
 
-    def get(self, name: str, default: Optional[str]=None) -> str:
+    def get(self, name: str, default: Optional[int]=None) -> int:
         if name in self.var2reg:
             return self.var2reg[name]
         if default is not None:
@@ -292,13 +459,13 @@ class RegEnv:
         return r
 
     def child(self) -> "RegEnv":
-        # Create a child scope that shares the same register counter
+        # Create a child scope that shares the same counters
         # but has its own variable mapping
-        c = RegEnv(shared_counter=self.reg_counter)
-        c.var2reg = dict(self.var2reg)
-        c.label_id = self.label_id
+        c = RegEnv(counters=self.counters)
+        c.var2reg = self.var2reg.new_child()
         return c
 
-    def new_label(self, prefix: str) -> str:
-        self.label_id += 1
-        return f"{prefix}_{self.label_id}"
\ No newline at end of file
+    def new_label(self, prefix: bytes) -> bytes:
+        c = self.counters
+        c.next_label += 1
+        return b"%s_%d" % (prefix, c.next_label)
@@ -1,7 +1,13 @@
 
+import re
+from bisect import bisect_right
+from collections import namedtuple
 import ply.lex as lex
 import sys
 
+# One lexed token; tokenize() returns a list of these
+Token = namedtuple('Token', 'line column type value lexpos')
+
 class TesLangLexer:
     
     tokens = (
@@ -60,6 +66,9 @@ class TesLangLexer:
         'print': 'PRINT',
     }
     
+    # Longer identifiers can never be keywords, whatever their case
+    _MAX_KW = max(map(len, reserved))
+    
     # Ignored characters
     t_ignore = ' \t\r'
     
@@ -123,7 +132,14 @@ class TesLangLexer:
     # Identifiers
     def t_ID(self, t):
         r'[a-zA-Z_][a-zA-Z_0-9]*'
-        t.type = self.reserved.get(t.value.lower(), 'ID')
+        if len(t.value) > self._MAX_KW:
+            t.type = 'ID'
+        else:
+            t.type = self.reserved.get(t.value.lower(), 'ID')
+        if t.type == 'ID':
+            # one string object per name, so symbol-table probes on it
+            # hit dict's identity check instead of comparing characters
+            t.value = sys.intern(t.value)
         return t
     
     # Comments 
@@ -131,29 +147,32 @@ class TesLangLexer:
         r'</'
         depth = 1
         start_line = t.lexer.lineno
+        data = t.lexer.lexdata
+        start = pos = t.lexer.lexpos
         
         while depth > 0:
             
-            if t.lexer.lexpos >= len(t.lexer.lexdata):
+            # jump straight to the next opening or closing delimiter
+            close = data.find('/>', pos)
+            if close < 0:
                 print(f" Error: Unclosed comment starting at line {start_line}")
+                pos = len(data)
                 break
             
             
-            next_chars = t.lexer.lexdata[t.lexer.lexpos:t.lexer.lexpos+2]
-            if next_chars == '</':
+            # an opener wins when it overlaps the closer, as in '</>'
+            opening = data.find('</', pos, close + 1)
+            if opening >= 0:
                 depth += 1
-                t.lexer.lexpos += 2
+                pos = opening + 2
         
-            elif next_chars == '/>':
-                depth -= 1
-                t.lexer.lexpos += 2
-            
             else:
-                # Count newlines
-                if t.lexer.lexdata[t.lexer.lexpos] == '\n':
-                    t.lexer.lineno += 1
-                t.lexer.lexpos += 1
-        pass
+                depth -= 1
+                pos = close + 2
+        
+        # Count newlines
+        t.lexer.lineno += data.count('\n', start, pos)
+        t.lexer.lexpos = pos
     
     #  line number tracking
     def t_newline(self, t):
@@ -168,35 +187,112 @@ class TesLangLexer:
     def build(self, **kwargs):
         """Build the lexer"""
         self.lexer = lex.lex(module=self, **kwargs)
+        self._build_scanner()
         return self.lexer
     
+    def _build_scanner(self):
+        """Fuse every rule into one master regex for tokenize().
+        
+        Rules keep PLY's priority: function rules in definition order,
+        then string rules by decreasing regex length. Token types are
+        interned so the parser can compare them by identity.
+        """
+        funcs = []
+        strings = []
+        for name in dir(self):
+            if not name.startswith('t_') or name in ('t_ignore', 't_error'):
+                continue
+            rule = getattr(self, name)
+            if callable(rule):
+                funcs.append((rule.__code__.co_firstlineno, name, rule))
+            else:
+                strings.append((name, rule))
+        funcs.sort()
+        strings.sort(key=lambda r: len(r[1]), reverse=True)
+        
+        parts = []
+        self._actions = {}
+        for _, name, rule in funcs:
+            parts.append(f'(?P<{name}>{rule.__doc__})')
+            self._actions[name] = (sys.intern(name[2:]), rule)
+        for name, regex in strings:
+            parts.append(f'(?P<{name}>{regex})')
+            self._actions[name] = (sys.intern(name[2:]), None)
+        self._master = re.compile('|'.join(parts), self.lexer.lexreflags)
+    
     def tokenize(self, data):
+        return list(self.iter_tokens(data))
+    
+    def iter_tokens(self, data):
+        """Yield the Tokens of data one at a time, lexing as they are read."""
         if not self.lexer:
             self.build()
         
-        self.lexer.input(data)
-        tokens = []
+        # Same rules and lexer state as PLY's token(), but string rules go
+        # straight to a Token without building a LexToken first.
+        lexer = self.lexer
+        lexer.input(data)
+        self.last_token = None
+        match = self._master.match
+        actions = self._actions
+        ignore = self.t_ignore
+        pos = 0
+        end = len(data)
+        # offset of the first character of every line, for column numbers
+        line_starts = [0]
+        line_starts.extend(m.end() for m in re.finditer('\n', data))
         
-        while True:
-            tok = self.lexer.token()
-            if not tok:
-                break
+        while pos < end:
+            if data[pos] in ignore:
+                pos += 1
+                continue
             
-            # Calculate column number
-            line_start = data.rfind('\n', 0, tok.lexpos) + 1
-            column = tok.lexpos - line_start + 1
+            m = match(data, pos)
+            if m is None:
+                tok = lex.LexToken()
+                tok.type = 'error'
+                tok.value = data[pos:]
+                tok.lineno = lexer.lineno
+                tok.lexpos = pos
+                tok.lexer = lexer
+                lexer.lexpos = pos
+                self.t_error(tok)
+                if lexer.lexpos == pos:
+                    raise lex.LexError(f"Scanning error. Illegal character {data[pos]!r}", data[pos:])
+                pos = lexer.lexpos
+                continue
             
-            tokens.append({
-                'line': tok.lineno,
-                'column': column,
-                'type': tok.type,
-                'value': tok.value,
-                'lexpos': tok.lexpos
-            })
+            tok_type, rule = actions[m.lastgroup]
+            tok_value = m.group()
+            tok_pos = pos
+            tok_line = lexer.lineno
+            pos = m.end()
+            
+            if rule is not None:
+                tok = lex.LexToken()
+                tok.type = tok_type
+                tok.value = tok_value
+                tok.lineno = tok_line
+                tok.lexpos = tok_pos
+                tok.lexer = lexer
+                lexer.lexpos = pos
+                tok = rule(tok)
+                # rules may consume more input (comments) or drop the token
+                pos = lexer.lexpos
+                if tok is None:
+                    continue
+                tok_type = tok.type
+                tok_value = tok.value
+            
+            # Calculate column number
+            column = tok_pos - line_starts[bisect_right(line_starts, tok_pos) - 1] + 1
             
+            tok = Token(tok_line, column, tok_type, tok_value, tok_pos)
+            # kept current as tokens are read, not only when lexing is done
             self.last_token = tok
+            yield tok
         
-        return tokens
+        lexer.lexpos = pos
     
     def tokenize_file(self, filename):
         """Tokenize from file"""
@@ -213,22 +309,26 @@ class TesLangLexer:
 
 
 def print_tokens(tokens):
-    if not tokens:
-        print("No tokens found!")
-        return
-    
-    print(f"{'Line':<6}| {'Column':<7}| {'Token':<20}| Value")
-    print("-" * 118)
-    
+    # tokens may be a generator, so the header waits for the first one.
+    # Rows go straight into stdout's buffer rather than a list so lexer
+    # messages printed while scanning stay next to their token.
+    write = sys.stdout.write
+    shown = False
     for tok in tokens:
-        value = str(tok['value'])
+        if not shown:
+            write(f"{'Line':<6}| {'Column':<7}| {'Token':<20}| Value\n" + "-" * 118 + "\n")
+            shown = True
+        value = str(tok.value)
         # Limit length for display
         if len(value) > 50:
             value = value[:47] + "..."
         # Display escape characters
         value = repr(value)[1:-1] if '\n' in value or '\t' in value else value
         
-        print(f"{tok['line']:<6}| {tok['column']:<7}| {tok['type']:<20}| {value}")
+        write(f"{tok.line:<6}| {tok.column:<7}| {tok.type:<20}| {value}\n")
+    
+    if not shown:
+        print("No tokens found!")
 
 
 def save_tokens(tokens, filename='tokens_output.txt'):
@@ -237,7 +337,7 @@ def save_tokens(tokens, filename='tokens_output.txt'):
             f.write(f"{'Line':<6}| {'Column':<7}| {'Token':<20}| Value\n")
             f.write("-" * 118 + "\n")
             for tok in tokens:
-                f.write(f"{tok['line']:<6}| {tok['column']:<7}| {tok['type']:<20}| {tok['value']}\n")
+                f.write(f"{tok.line:<6}| {tok.column:<7}| {tok.type:<20}| {tok.value}\n")
         print(f"Tokens saved to '{filename}'")
     except Exception as e:
         print(f" Error saving tokens: {e}")
@@ -32,10 +32,15 @@ from semantic import SemanticAnalyzer
 from codegen_tsvm import TSVMCodeGen
 
 def read_input(argv):
+    # read raw bytes and decode once
     if len(argv) == 2:
-        with open(argv[1], "r", encoding="utf-8") as f:
-            return f.read()
-    return sys.stdin.read()
+        with open(argv[1], "rb") as f:
+            text = f.read().decode("utf-8")
+        # translate newlines as open(..., "r") would: '\r\n' and a lone
+        # '\r' both end a line
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+    # sys.stdin doesn't translate newlines on POSIX, so neither does this
+    return sys.stdin.buffer.read().decode("utf-8")
 
 def usage():
     print("Usage:")
@@ -47,7 +52,12 @@ def usage():
     print("  python main.py check file.tes")
     print("  python main.py gen file.tes")
 
+def print_errors(errors):
+    sys.stdout.write("".join(f"Error at {er.line}:{er.column} - {er.message}\n" for er in errors))
+
 def main():
+    # block-buffer stdout even on a terminal; everything is flushed at exit
+    sys.stdout.reconfigure(line_buffering=False)
     if len(sys.argv) < 2:
         usage()
         sys.exit(1)
@@ -55,41 +65,49 @@ def main():
     mode = sys.argv[1].lower()
     data = read_input(sys.argv[1:])
 
+    # tokens are lexed as the printer / parser asks for them
     lexer = TesLangLexer()
-    tokens = lexer.tokenize(data)
+    tokens = lexer.iter_tokens(data)
 
     if mode == "lex":
         print_tokens(tokens)
         return
 
     # parse
+    parser = Parser(tokens)
     try:
-        parser = Parser(tokens)
         program = parser.parse_program()
     except ParseError as e:
+        # finish lexing so every lexer message still comes out first
+        parser.ts.fill_all()
         print(str(e))
         return
 
     # semantic
     sema = SemanticAnalyzer()
+    if mode == "gen":
+        # check and generate one function at a time, while its tree is
+        # still warm; the code is only printed if no function had errors
+        gen = TSVMCodeGen()
+        gen.begin()
+        for fn in sema.declare_functions(program):
+            sema.analyze_function(fn)
+            if not sema.errors:
+                gen.generate_function(fn)
+        errors = sema.finish(program)
+        if errors:
+            print_errors(errors)
+            print("\nCode generation skipped due to errors.")
+            return
+        print(gen.finish())
+        return
+
     errors = sema.analyze(program)
     if mode == "check":
         if not errors:
             print("OK: no syntax/semantic errors found.")
         else:
-            for er in errors:
-                print(f"Error at {er.line}:{er.column} - {er.message}")
-        return
-
-    if mode == "gen":
-        if errors:
-            for er in errors:
-                print(f"Error at {er.line}:{er.column} - {er.message}")
-            print("\nCode generation skipped due to errors.")
-            return
-        gen = TSVMCodeGen()
-        out = gen.generate(program)
-        print(out)
+            print_errors(errors)
         return
 
     usage()
@@ -1,7 +1,103 @@
 from __future__ import annotations
-from typing import List, Optional
+import sys
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from ast_nodes import *
 
+if TYPE_CHECKING:
+    from lexer import Token
+
+# Token types. The lexer interns its type strings, so the parser compares
+# them with `is`.
+_intern = sys.intern
+T_AND = _intern("AND")
+T_ARROW = _intern("ARROW")
+T_AS = _intern("AS")
+T_BEGIN = _intern("BEGIN")
+T_BOOL = _intern("BOOL")
+T_COLON = _intern("COLON")
+T_COMMA = _intern("COMMA")
+T_DBL_COLON = _intern("DBL_COLON")
+T_DBL_LSQUARE = _intern("DBL_LSQUARE")
+T_DBL_RSQUARE = _intern("DBL_RSQUARE")
+T_DIV = _intern("DIV")
+T_DO = _intern("DO")
+T_ELSE = _intern("ELSE")
+T_END = _intern("END")
+T_ENDFOR = _intern("ENDFOR")
+T_ENDIF = _intern("ENDIF")
+T_ENDWHILE = _intern("ENDWHILE")
+T_EQ = _intern("EQ")
+T_EQ_EQ = _intern("EQ_EQ")
+T_FOR = _intern("FOR")
+T_FUNK = _intern("FUNK")
+T_GREATER_EQ = _intern("GREATER_EQ")
+T_GREATER_THAN = _intern("GREATER_THAN")
+T_ID = _intern("ID")
+T_IF = _intern("IF")
+T_INT = _intern("INT")
+T_LCURLYEBR = _intern("LCURLYEBR")
+T_LESS_EQ = _intern("LESS_EQ")
+T_LESS_THAN = _intern("LESS_THAN")
+T_LPAREN = _intern("LPAREN")
+T_LSQUAREBR = _intern("LSQUAREBR")
+T_MINUS = _intern("MINUS")
+T_MSTR = _intern("MSTR")
+T_MSTRING = _intern("MSTRING")
+T_MULT = _intern("MULT")
+T_NOT = _intern("NOT")
+T_NOT_EQ = _intern("NOT_EQ")
+T_NULL = _intern("NULL")
+T_NUMBER = _intern("NUMBER")
+T_OR = _intern("OR")
+T_PLUS = _intern("PLUS")
+T_QUESTION = _intern("QUESTION")
+T_RCURLYEBR = _intern("RCURLYEBR")
+T_RETURN = _intern("RETURN")
+T_RPAREN = _intern("RPAREN")
+T_RSQUAREBR = _intern("RSQUAREBR")
+T_SEMI_COLON = _intern("SEMI_COLON")
+T_STR = _intern("STR")
+T_STRING = _intern("STRING")
+T_TO = _intern("TO")
+T_VECTOR = _intern("VECTOR")
+T_WHILE = _intern("WHILE")
+
+# binary operator token -> (precedence, operator); higher binds tighter
+_BINARY_OPS = {
+    T_OR: (1, "||"),
+    T_AND: (2, "&&"),
+    T_EQ_EQ: (3, "=="), T_NOT_EQ: (3, "!="),
+    T_LESS_THAN: (4, "<"), T_GREATER_THAN: (4, ">"),
+    T_LESS_EQ: (4, "<="), T_GREATER_EQ: (4, ">="),
+    T_PLUS: (5, "+"), T_MINUS: (5, "-"),
+    T_MULT: (6, "*"), T_DIV: (6, "/"),
+}
+
+_UNARY_OPS = {T_NOT: "!", T_PLUS: "+", T_MINUS: "-"}
+
+# type keyword -> the type name the AST uses. Keywords are matched
+# case-insensitively, so this is the value lowercased, without the call.
+# Also the set expect_any checks type annotations against: a dict is a
+# hash lookup like a frozenset, but keeps the order the error lists.
+_TYPE_NAMES = {
+    T_INT: "int", T_VECTOR: "vector", T_STR: "str",
+    T_MSTR: "mstr", T_BOOL: "bool", T_NULL: "null",
+}
+
+# Expression nodes are built positionally, in ast_nodes field order:
+# line, column, then the node's own fields.
+
+# single-token primaries: token type -> node built from the token's value
+_LEAF_NODES = {T_NUMBER: Number, T_STRING: String, T_MSTRING: MString, T_ID: Identifier}
+
+# tokens that close an argument (call or vector literal) / an index
+# tokens pulled from a streaming source at a time
+_FILL_CHUNK = 256
+
+_ARG_END = frozenset((T_COMMA, T_RPAREN, T_RSQUAREBR))
+_INDEX_END = frozenset((T_RSQUAREBR,))
+
 class ParseError(Exception):
     def __init__(self, message: str, line: int, col: int):
         super().__init__(f"ParseError at {line}:{col} - {message}")
@@ -10,46 +106,123 @@ class ParseError(Exception):
         self.col = col
 
 class TokenStream:
-    def __init__(self, tokens: List[dict]):
-        self.tokens = tokens
+    # The parser goes through these methods for every token it looks at,
+    # so they index the list directly against a cached length. Token types
+    # are also kept as a column of their own: most lookahead only needs
+    # the type, and types[i] skips fetching the whole Token.
+    #
+    # Given an iterator instead of a list (TesLangLexer.iter_tokens), the
+    # stream pulls tokens in chunks as the parser reaches the end of what
+    # it has; fill() is only called on that miss path.
+    __slots__ = ("tokens", "types", "i", "n", "_source")
+
+    def __init__(self, tokens: Iterable[Token]):
+        if isinstance(tokens, list):
+            self.tokens = tokens
+            self._source = None
+        else:
+            self.tokens = []
+            self._source = iter(tokens)
+        self.types: List[str] = [t.type for t in self.tokens]
         self.i = 0
+        self.n = len(self.tokens)
+
+    def fill(self, j: int) -> bool:
+        """Pull tokens until index j exists; False if the input ends first."""
+        source = self._source
+        while self.n <= j:
+            if source is None:
+                return False
+            chunk = list(islice(source, _FILL_CHUNK))
+            if not chunk:
+                self._source = None
+                return False
+            self.tokens.extend(chunk)
+            self.types.extend([t.type for t in chunk])
+            self.n += len(chunk)
+        return True
+
+    def fill_all(self):
+        self.fill(sys.maxsize)
+
+    def peek_type(self, k: int = 0) -> Optional[str]:
+        j = self.i + k
+        if j < self.n or self.fill(j):
+            return self.types[j]
+        return None
 
-    def peek(self, k: int = 0) -> Optional[dict]:
+    def peek(self, k: int = 0) -> Optional[Token]:
         j = self.i + k
-        if j >= len(self.tokens):
-            return None
-        return self.tokens[j]
+        if j < self.n or self.fill(j):
+            return self.tokens[j]
+        return None
 
     def at_end(self) -> bool:
-        return self.i >= len(self.tokens)
+        return self.i >= self.n and not self.fill(self.i)
 
-    def advance(self) -> Optional[dict]:
-        tok = self.peek()
-        if tok is not None:
-            self.i += 1
-        return tok
+    def advance(self) -> Optional[Token]:
+        i = self.i
+        if i < self.n or self.fill(i):
+            self.i = i + 1
+            return self.tokens[i]
+        return None
 
-    def match(self, *types: str) -> Optional[dict]:
-        tok = self.peek()
-        if tok and tok["type"] in types:
-            return self.advance()
+    def match_one(self, ttype: str) -> Optional[Token]:
+        i = self.i
+        if (i < self.n or self.fill(i)) and self.types[i] is ttype:
+            self.i = i + 1
+            return self.tokens[i]
         return None
 
-    def expect(self, ttype: str) -> dict:
+    def expect(self, ttype: str) -> Token:
+        i = self.i
+        if (i < self.n or self.fill(i)) and self.types[i] is ttype:
+            self.i = i + 1
+            return self.tokens[i]
+        self._raise_expect(ttype)
+
+    def expect_any(self, types) -> Token:
+        i = self.i
+        if (i < self.n or self.fill(i)) and self.types[i] in types:
+            self.i = i + 1
+            return self.tokens[i]
+        self._raise_expect(f"one of {tuple(types)}")
+
+    def _raise_expect(self, expected: str):
+        # error path of expect / expect_any, kept out of their fast path
         tok = self.peek()
-        if not tok or tok["type"] != ttype:
-            line = tok["line"] if tok else -1
-            col = tok["column"] if tok else -1
-            got = tok["type"] if tok else "EOF"
-            raise ParseError(f"Expected {ttype}, got {got}", line, col)
-        return self.advance()
-
-def _loc(tok: dict):
-    return tok["line"], tok["column"]
+        line = tok.line if tok else -1
+        col = tok.column if tok else -1
+        got = tok.type if tok else "EOF"
+        raise ParseError(f"Expected {expected}, got {got}", line, col)
 
 class Parser:
-    def __init__(self, tokens: List[dict]):
+    def __init__(self, tokens: Iterable[Token], memoize: bool = False):
         self.ts = TokenStream(tokens)
+        # IF token index -> whether an ELSE belongs to it, filled in by
+        # _scan_if_else as far as the stream has been read
+        self._else_of: Dict[int, bool] = {}
+        self._open_ifs: List[int] = []
+        self._scanned = 0
+        # opt-in packrat cache: start index -> (expr, end index). The parser
+        # never backtracks, so an entry is valid for the whole parse.
+        self.memoize = memoize
+        self._expr_memo: Dict[int, Tuple[Expr, int]] = {}
+        # statements that are recognised by their first token
+        self._stmt_dispatch = {
+            T_FUNK: self.parse_function,  # nested function definition allowed per spec
+            T_RETURN: self._parse_return,
+            T_IF: self.parse_if,
+            T_WHILE: self.parse_while,
+            T_DO: self.parse_do_while,
+            T_FOR: self.parse_for,
+            T_BEGIN: self._parse_begin,
+        }
+        # primaries that aren't a single token (see _LEAF_NODES)
+        self._primary_dispatch = {
+            T_LSQUAREBR: self._parse_vector_literal,
+            T_LPAREN: self._parse_parens,
+        }
 
     def parse_program(self) -> Program:
         prog = Program()
@@ -60,35 +233,34 @@ class Parser:
         return prog
 
     def parse_function(self) -> FunctionDef:
-        t_funk = self.ts.expect("FUNK")
-        line, col = _loc(t_funk)
-        self.ts.expect("LESS_THAN")
-        ret_type_tok = self.ts.expect_any(("INT","VECTOR","STR","MSTR","BOOL","NULL"))
-        self.ts.expect("GREATER_THAN")
-        name_tok = self.ts.expect("ID")
-        self.ts.expect("LPAREN")
+        t_funk = self.ts.expect(T_FUNK)
+        self.ts.expect(T_LESS_THAN)
+        ret_type_tok = self.ts.expect_any(_TYPE_NAMES)
+        self.ts.expect(T_GREATER_THAN)
+        name_tok = self.ts.expect(T_ID)
+        self.ts.expect(T_LPAREN)
         params = self.parse_param_list_opt()
-        self.ts.expect("RPAREN")
+        self.ts.expect(T_RPAREN)
 
         fn = FunctionDef(
-            name=name_tok["value"],
-            return_type=ret_type_tok["value"].lower() if isinstance(ret_type_tok["value"], str) else ret_type_tok["type"].lower(),
+            name=name_tok.value,
+            return_type=_TYPE_NAMES[ret_type_tok.type],
             params=params,
-            line=line,
-            column=col,
+            line=t_funk.line,
+            column=t_funk.column,
         )
 
-        if self.ts.match("LCURLYEBR"):
-            body = self.parse_body_until("RCURLYEBR")
-            self.ts.expect("RCURLYEBR")
+        if self.ts.match_one(T_LCURLYEBR):
+            body = self.parse_body_until(T_RCURLYEBR)
+            self.ts.expect(T_RCURLYEBR)
             fn.body = body
             return fn
 
-        if self.ts.match("ARROW"):
-            self.ts.expect("RETURN")
+        if self.ts.match_one(T_ARROW):
+            self.ts.expect(T_RETURN)
             expr = self.parse_expr()
             # arrow form ends with SEMI_COLON in grammar
-            if self.ts.match("SEMI_COLON") is None:
+            if self.ts.match_one(T_SEMI_COLON) is None:
                 # tolerate missing ; but report strictness in semantic if you want
                 pass
             fn.arrow_return_expr = expr
@@ -96,355 +268,315 @@ class Parser:
             return fn
 
         tok = self.ts.peek()
-        raise ParseError("Expected '{' or '=>'", tok["line"], tok["column"])
+        raise ParseError("Expected '{' or '=>'", tok.line, tok.column)
 
     def parse_param_list_opt(self) -> List[Param]:
+        ts = self.ts
+        expect, match_one = ts.expect, ts.match_one
         params: List[Param] = []
-        tok = self.ts.peek()
-        if not tok or tok["type"] == "RPAREN":
+        if ts.peek_type() in (None, T_RPAREN):
             return params
         while True:
-            name_tok = self.ts.expect("ID")
-            self.ts.expect("AS")
-            type_tok = self.ts.expect_any(("INT","VECTOR","STR","MSTR","BOOL","NULL"))
+            name_tok = expect(T_ID)
+            expect(T_AS)
+            type_tok = ts.expect_any(_TYPE_NAMES)
             params.append(Param(
-                name=name_tok["value"],
-                type_name=type_tok["value"].lower() if isinstance(type_tok["value"], str) else type_tok["type"].lower(),
-                line=name_tok["line"],
-                column=name_tok["column"]
+                name=name_tok.value,
+                type_name=_TYPE_NAMES[type_tok.type],
+                line=name_tok.line,
+                column=name_tok.column
             ))
-            if self.ts.match("COMMA") is None:
+            if match_one(T_COMMA) is None:
                 break
         return params
 
     # ---------------- BODY----------------
     def parse_body_until(self, end_token: str) -> Block:
         block = Block()
+        peek_type = self.ts.peek_type
+        parse_stmt = self.parse_stmt
+        append = block.statements.append
         while True:
-            tok = self.ts.peek()
-            if tok is None or tok["type"] == end_token:
+            tt = peek_type()
+            if tt is None or tt is end_token:
                 break
-            stmt = self.parse_stmt()
-            block.statements.append(stmt)
+            append(parse_stmt())
         return block
 
     def parse_stmt(self) -> Stmt:
-        tok = self.ts.peek()
-        if not tok:
+        ts = self.ts
+        ttype = ts.peek_type()
+        if ttype is None:
             raise ParseError("Unexpected EOF", -1, -1)
 
-        ttype = tok["type"]
-
-        # Nested function definition allowed per spec
-        if ttype == "FUNK":
-            fn = self.parse_function()
-            return fn  # treat as stmt node
-        if ttype == "RETURN":
-            t = self.ts.advance()
-            expr = None
-            # return expr ;
-            if self.ts.peek() and self.ts.peek()["type"] != "SEMI_COLON":
-                expr = self.parse_expr()
-            self.ts.match("SEMI_COLON")
-            return Return(value=expr, line=t["line"], column=t["column"])
-
-        if ttype == "IF":
-            return self.parse_if()
-
-        if ttype == "WHILE":
-            return self.parse_while()
-
-        if ttype == "DO":
-            return self.parse_do_while()
-
-        if ttype == "FOR":
-            return self.parse_for()
-
-        # BEGIN body END  (block statement)
-        if ttype == "BEGIN":
-            t = self.ts.advance()
-            body = self.parse_body_until("END")
-            self.ts.expect("END")
-            return body
+        fn = self._stmt_dispatch.get(ttype)
+        if fn is not None:
+            return fn()
 
         # variable definition: id :: type (= expr)? ;
         # lookahead: ID DBL_COLON
-        if ttype == "ID" and self.ts.peek(1) and self.ts.peek(1)["type"] == "DBL_COLON":
+        if ttype is T_ID and ts.peek_type(1) is T_DBL_COLON:
             return self.parse_vardecl()
 
         # Otherwise: expression statement
         expr = self.parse_expr()
-        self.ts.match("SEMI_COLON")
+        ts.match_one(T_SEMI_COLON)
         return ExprStmt(expr=expr, line=expr.line, column=expr.column)
 
+    def _parse_return(self) -> Return:
+        t = self.ts.advance()
+        expr = None
+        # return expr ;
+        if self.ts.peek_type() not in (None, T_SEMI_COLON):
+            expr = self.parse_expr()
+        self.ts.match_one(T_SEMI_COLON)
+        return Return(value=expr, line=t.line, column=t.column)
+
+    def _parse_begin(self) -> Block:
+        # BEGIN body END  (block statement)
+        self.ts.advance()
+        body = self.parse_body_until(T_END)
+        self.ts.expect(T_END)
+        return body
+
     def parse_vardecl(self) -> VarDecl:
-        name_tok = self.ts.expect("ID")
-        self.ts.expect("DBL_COLON")
-        type_tok = self.ts.expect_any(("INT","VECTOR","STR","MSTR","BOOL","NULL"))
+        name_tok = self.ts.expect(T_ID)
+        self.ts.expect(T_DBL_COLON)
+        type_tok = self.ts.expect_any(_TYPE_NAMES)
         init = None
-        if self.ts.match("EQ"):
+        if self.ts.match_one(T_EQ):
             init = self.parse_expr()
-        self.ts.match("SEMI_COLON")
+        self.ts.match_one(T_SEMI_COLON)
         return VarDecl(
-            name=name_tok["value"],
-            type_name=type_tok["value"].lower() if isinstance(type_tok["value"], str) else type_tok["type"].lower(),
+            name=name_tok.value,
+            type_name=_TYPE_NAMES[type_tok.type],
             init=init,
-            line=name_tok["line"],
-            column=name_tok["column"],
+            line=name_tok.line,
+            column=name_tok.column,
         )
 
     def parse_if(self) -> IfStmt:
-        t = self.ts.expect("IF")
-        self.ts.expect("DBL_LSQUARE")
+        ts = self.ts
+        expect = ts.expect
+        t = expect(T_IF)
+        if_idx = ts.i - 1
+        expect(T_DBL_LSQUARE)
         cond = self.parse_expr()
-        self.ts.expect("DBL_RSQUARE")
-        self.ts.expect("BEGIN")
-        then_block = self.parse_body_until("ENDIF" if self._next_has_else() is False else "ELSE")
+        expect(T_DBL_RSQUARE)
+        expect(T_BEGIN)
+        then_block = self.parse_body_until(T_ENDIF if self._next_has_else(if_idx) is False else T_ELSE)
         else_block = None
-        if self.ts.match("ELSE"):
-            else_block = self.parse_body_until("ENDIF")
-        self.ts.expect("ENDIF")
-        return IfStmt(cond=cond, then_block=then_block, else_block=else_block, line=t["line"], column=t["column"])
-
-    def _next_has_else(self) -> bool:
-        # crude: scan ahead until ENDIF/ELSE at same nesting level
-        depth = 0
-        j = self.ts.i
-        while j < len(self.ts.tokens):
-            tt = self.ts.tokens[j]["type"]
-            if tt == "IF":
-                depth += 1
-            elif tt == "ENDIF":
-                if depth == 0:
-                    return False
-                depth -= 1
-            elif tt == "ELSE" and depth == 0:
-                return True
-            j += 1
-        return False
+        if ts.match_one(T_ELSE):
+            else_block = self.parse_body_until(T_ENDIF)
+        expect(T_ENDIF)
+        return IfStmt(cond=cond, then_block=then_block, else_block=else_block, line=t.line, column=t.column)
+
+    def _next_has_else(self, if_idx: int) -> bool:
+        # read ahead only as far as this IF's ELSE or matching ENDIF
+        else_of = self._else_of
+        ts = self.ts
+        while if_idx not in else_of:
+            self._scan_if_else()
+            if if_idx in else_of or not ts.fill(ts.n):
+                break
+        return else_of.get(if_idx, False)
+
+    def _scan_if_else(self):
+        # One pass over the token types read so far: an IF is True once an
+        # ELSE shows up at its nesting level, False at its matching ENDIF
+        else_of = self._else_of
+        open_ifs = self._open_ifs
+        types = self.ts.types
+        for j in range(self._scanned, self.ts.n):
+            tt = types[j]
+            if tt is T_IF:
+                open_ifs.append(j)
+            elif tt is T_ENDIF:
+                if open_ifs:
+                    else_of.setdefault(open_ifs.pop(), False)
+            elif tt is T_ELSE and open_ifs:
+                else_of[open_ifs[-1]] = True
+        self._scanned = self.ts.n
 
     def parse_while(self) -> WhileStmt:
-        t = self.ts.expect("WHILE")
-        self.ts.expect("DBL_LSQUARE")
+        expect = self.ts.expect
+        t = expect(T_WHILE)
+        expect(T_DBL_LSQUARE)
         cond = self.parse_expr()
-        self.ts.expect("DBL_RSQUARE")
-        self.ts.expect("BEGIN")
-        body = self.parse_body_until("ENDWHILE")
-        self.ts.expect("ENDWHILE")
-        return WhileStmt(cond=cond, body=body, line=t["line"], column=t["column"])
+        expect(T_DBL_RSQUARE)
+        expect(T_BEGIN)
+        body = self.parse_body_until(T_ENDWHILE)
+        expect(T_ENDWHILE)
+        return WhileStmt(cond=cond, body=body, line=t.line, column=t.column)
 
     def parse_do_while(self) -> DoWhileStmt:
-        t = self.ts.expect("DO")
-        self.ts.expect("BEGIN")
-        body = self.parse_body_until("WHILE")
-        self.ts.expect("WHILE")
-        self.ts.expect("DBL_LSQUARE")
+        t = self.ts.expect(T_DO)
+        self.ts.expect(T_BEGIN)
+        body = self.parse_body_until(T_WHILE)
+        self.ts.expect(T_WHILE)
+        self.ts.expect(T_DBL_LSQUARE)
         cond = self.parse_expr()
-        self.ts.expect("DBL_RSQUARE")
-        self.ts.expect("ENDWHILE")
-        return DoWhileStmt(body=body, cond=cond, line=t["line"], column=t["column"])
+        self.ts.expect(T_DBL_RSQUARE)
+        self.ts.expect(T_ENDWHILE)
+        return DoWhileStmt(body=body, cond=cond, line=t.line, column=t.column)
 
     def parse_for(self) -> ForStmt:
-        t = self.ts.expect("FOR")
-        self.ts.expect("LPAREN")
-        var_tok = self.ts.expect("ID")
-        self.ts.expect("EQ")
+        expect = self.ts.expect
+        t = expect(T_FOR)
+        expect(T_LPAREN)
+        var_tok = expect(T_ID)
+        expect(T_EQ)
         start = self.parse_expr()
-        self.ts.expect("TO")
+        expect(T_TO)
         end = self.parse_expr()
-        self.ts.expect("RPAREN")
-        self.ts.expect("BEGIN")
-        body = self.parse_body_until("ENDFOR")
-        self.ts.expect("ENDFOR")
-        return ForStmt(var_name=var_tok["value"], start=start, end=end, body=body, line=t["line"], column=t["column"])
+        expect(T_RPAREN)
+        expect(T_BEGIN)
+        body = self.parse_body_until(T_ENDFOR)
+        expect(T_ENDFOR)
+        return ForStmt(var_name=var_tok.value, start=start, end=end, body=body, line=t.line, column=t.column)
 
     # ---------------- EXPRESSIONS (precedence) ----------------
     def parse_expr(self) -> Expr:
-        return self.parse_assignment()
+        if not self.memoize:
+            return self.parse_assignment()
+        ts = self.ts
+        start = ts.i
+        hit = self._expr_memo.get(start)
+        if hit is not None:
+            node, ts.i = hit
+            return node
+        node = self.parse_assignment()
+        self._expr_memo[start] = (node, ts.i)
+        return node
 
     def parse_assignment(self) -> Expr:
         expr = self.parse_ternary()
-        if isinstance(expr, Identifier) and self.ts.match("EQ"):
+        if isinstance(expr, Identifier) and self.ts.match_one(T_EQ):
             value = self.parse_expr()
-            return Assign(target=expr, value=value, line=expr.line, column=expr.column)
+            return Assign(expr.line, expr.column, expr, value)
         return expr
 
     def parse_ternary(self) -> Expr:
-        cond = self.parse_or()
-        if self.ts.match("QUESTION"):
+        cond = self.parse_binary()
+        if self.ts.match_one(T_QUESTION):
             then_e = self.parse_expr()
-            self.ts.expect("COLON")
+            self.ts.expect(T_COLON)
             else_e = self.parse_expr()
-            return TernaryOp(cond=cond, then_expr=then_e, else_expr=else_e, line=cond.line, column=cond.column)
+            return TernaryOp(cond.line, cond.column, cond, then_e, else_e)
         return cond
 
-    def parse_or(self) -> Expr:
-        expr = self.parse_and()
-        while self.ts.match("OR"):
-            op_tok = self.ts.tokens[self.ts.i-1]
-            rhs = self.parse_and()
-            expr = BinaryOp(op="||", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-        return expr
-
-    def parse_and(self) -> Expr:
-        expr = self.parse_equality()
-        while self.ts.match("AND"):
-            op_tok = self.ts.tokens[self.ts.i-1]
-            rhs = self.parse_equality()
-            expr = BinaryOp(op="&&", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-        return expr
-
-    def parse_equality(self) -> Expr:
-        expr = self.parse_relational()
-        while True:
-            if self.ts.match("EQ_EQ"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_relational()
-                expr = BinaryOp(op="==", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("NOT_EQ"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_relational()
-                expr = BinaryOp(op="!=", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            else:
-                break
-        return expr
-
-    def parse_relational(self) -> Expr:
-        expr = self.parse_additive()
-        while True:
-            if self.ts.match("LESS_THAN"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_additive()
-                expr = BinaryOp(op="<", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("GREATER_THAN"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_additive()
-                expr = BinaryOp(op=">", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("LESS_EQ"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_additive()
-                expr = BinaryOp(op="<=", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("GREATER_EQ"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_additive()
-                expr = BinaryOp(op=">=", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            else:
-                break
-        return expr
-
-    def parse_additive(self) -> Expr:
-        expr = self.parse_multiplicative()
-        while True:
-            if self.ts.match("PLUS"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_multiplicative()
-                expr = BinaryOp(op="+", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("MINUS"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_multiplicative()
-                expr = BinaryOp(op="-", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            else:
-                break
-        return expr
-
-    def parse_multiplicative(self) -> Expr:
+    def parse_binary(self, min_prec: int = 1) -> Expr:
+        # precedence climbing over _BINARY_OPS; every level is left-assoc
         expr = self.parse_unary()
+        ts = self.ts
+        binop = BinaryOp
         while True:
-            if self.ts.match("MULT"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_unary()
-                expr = BinaryOp(op="*", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            elif self.ts.match("DIV"):
-                op_tok = self.ts.tokens[self.ts.i-1]
-                rhs = self.parse_unary()
-                expr = BinaryOp(op="/", left=expr, right=rhs, line=op_tok["line"], column=op_tok["column"])
-            else:
+            info = _BINARY_OPS.get(ts.peek_type())
+            if info is None or info[0] < min_prec:
                 break
+            prec, op = info
+            tok = ts.tokens[ts.i]
+            ts.i += 1
+            rhs = self.parse_binary(prec + 1)
+            expr = binop(tok.line, tok.column, op, expr, rhs)
         return expr
 
     def parse_unary(self) -> Expr:
-        tok = self.ts.peek()
-        if tok and tok["type"] in ("NOT","PLUS","MINUS"):
-            op_tok = self.ts.advance()
-            operand = self.parse_unary()
-            op_map = {"NOT":"!", "PLUS":"+", "MINUS":"-"}
-            return UnaryOp(op=op_map[op_tok["type"]], operand=operand, line=op_tok["line"], column=op_tok["column"])
-        return self.parse_postfix()
+        # collect the whole prefix chain (`!!x`, `- -x`) in one loop, then
+        # wrap the operand from the innermost operator out
+        ts = self.ts
+        peek_type = ts.peek_type
+        ops = None
+        while peek_type() in _UNARY_OPS:
+            if ops is None:
+                ops = []
+            ops.append(ts.tokens[ts.i])
+            ts.i += 1
+        expr = self.parse_postfix()
+        if ops is not None:
+            for op_tok in reversed(ops):
+                expr = UnaryOp(op_tok.line, op_tok.column, _UNARY_OPS[op_tok.type], expr)
+        return expr
 
     def parse_postfix(self) -> Expr:
         expr = self.parse_primary()
+        ts = self.ts
+        match_one, expect = ts.match_one, ts.expect
         while True:
-            if self.ts.match("LPAREN"):
+            if match_one(T_LPAREN):
                 # call
                 args = self.parse_arg_list_opt()
-                self.ts.expect("RPAREN")
+                expect(T_RPAREN)
                 if not isinstance(expr, Identifier):
                     raise ParseError("Call target must be identifier", expr.line, expr.column)
-                expr = Call(func=expr, args=args, line=expr.line, column=expr.column)
-            elif self.ts.match("LSQUAREBR"):
-                idx = self.parse_expr()
-                self.ts.expect("RSQUAREBR")
-                expr = Index(base=expr, index=idx, line=expr.line, column=expr.column)
+                expr = Call(expr.line, expr.column, expr, args)
+            elif match_one(T_LSQUAREBR):
+                idx = self._parse_leaf(_INDEX_END) or self.parse_expr()
+                expect(T_RSQUAREBR)
+                expr = Index(expr.line, expr.column, expr, idx)
             else:
                 break
         return expr
 
     def parse_arg_list_opt(self) -> List[Expr]:
+        ts = self.ts
         args: List[Expr] = []
-        tok = self.ts.peek()
-        if not tok or tok["type"] == "RPAREN":
+        if ts.peek_type() in (None, T_RPAREN):
             return args
+        match_one = ts.match_one
+        parse_expr = self.parse_expr
+        parse_leaf = self._parse_leaf
         while True:
-            args.append(self.parse_expr())
-            if self.ts.match("COMMA") is None:
+            args.append(parse_leaf(_ARG_END) or parse_expr())
+            if match_one(T_COMMA) is None:
                 break
         return args
 
+    def _parse_leaf(self, closers) -> Optional[Expr]:
+        # A lone leaf token (ID / NUMBER / STRING / MSTRING) directly
+        # followed by one of `closers` is a whole expression; build it here
+        # instead of going down through every precedence level of
+        # parse_expr. None if that isn't the case.
+        ts = self.ts
+        i = ts.i
+        if (i + 1 >= ts.n and not ts.fill(i + 1)) or ts.types[i + 1] not in closers:
+            return None
+        leaf = _LEAF_NODES.get(ts.types[i])
+        if leaf is None:
+            return None
+        t = ts.tokens[i]
+        ts.i = i + 1
+        return leaf(t.line, t.column, t.value)
+
     def parse_primary(self) -> Expr:
-        tok = self.ts.peek()
+        ts = self.ts
+        tok = ts.peek()
         if not tok:
             raise ParseError("Unexpected EOF in expression", -1, -1)
 
-        if self.ts.match("NUMBER"):
-            t = self.ts.tokens[self.ts.i-1]
-            return Number(value=t["value"], line=t["line"], column=t["column"])
-
-        if self.ts.match("STRING"):
-            t = self.ts.tokens[self.ts.i-1]
-            return String(value=t["value"], line=t["line"], column=t["column"])
-
-        if self.ts.match("MSTRING"):
-            t = self.ts.tokens[self.ts.i-1]
-            return MString(value=t["value"], line=t["line"], column=t["column"])
-
-        if self.ts.match("ID"):
-            t = self.ts.tokens[self.ts.i-1]
-            return Identifier(name=t["value"], line=t["line"], column=t["column"])
-
-        if self.ts.match("LSQUAREBR"):
-            # [ clist ]  => vector literal
-            items = []
-            if self.ts.peek() and self.ts.peek()["type"] != "RSQUAREBR":
-                items = self.parse_arg_list_opt()
-            self.ts.expect("RSQUAREBR")
-            start_tok = tok
-            return VectorLiteral(items=items, line=start_tok["line"], column=start_tok["column"])
-
-        if self.ts.match("LPAREN"):
-            expr = self.parse_expr()
-            self.ts.expect("RPAREN")
-            return expr
-
-        raise ParseError(f"Unexpected token {tok['type']} in expression", tok["line"], tok["column"])
-
-# helper: expect_any
-def _expect_any(self, types):
-    tok = self.peek()
-    if not tok or tok["type"] not in types:
-        line = tok["line"] if tok else -1
-        col = tok["column"] if tok else -1
-        got = tok["type"] if tok else "EOF"
-        raise ParseError(f"Expected one of {types}, got {got}", line, col)
-    return self.advance()
-
-TokenStream.expect_any = _expect_any
+        leaf = _LEAF_NODES.get(tok.type)
+        if leaf is not None:
+            ts.i += 1
+            return leaf(tok.line, tok.column, tok.value)
+
+        parse = self._primary_dispatch.get(tok.type)
+        if parse is not None:
+            return parse(tok)
+
+        raise ParseError(f"Unexpected token {tok.type} in expression", tok.line, tok.column)
+
+    def _parse_vector_literal(self, tok: Token) -> VectorLiteral:
+        # [ clist ]  => vector literal
+        ts = self.ts
+        ts.i += 1
+        items = []
+        if ts.peek_type() not in (None, T_RSQUAREBR):
+            items = self.parse_arg_list_opt()
+        ts.expect(T_RSQUAREBR)
+        return VectorLiteral(tok.line, tok.column, items)
+
+    def _parse_parens(self, tok: Token) -> Expr:
+        self.ts.i += 1
+        expr = self.parse_expr()
+        self.ts.expect(T_RPAREN)
+        return expr
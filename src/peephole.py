@@ -0,0 +1,54 @@
+from __future__ import annotations
+from typing import List, Set
+from regalloc import LABEL, COMMENT
+
+# Cleanups for the instructions of one TSVM proc, run after register
+# allocation:
+#   - drop `mov rX, rX`
+#   - drop code that follows a `ret` / `jmp` and no label can reach
+#     (e.g. the default `mov r0, 0; ret` trailer after an explicit return)
+#   - drop labels nothing jumps to
+#   - drop a `jmp L` whose target is the very next line
+
+def _targets(lines: List[tuple]) -> Set[bytes]:
+    used = set()
+    for ins in lines:
+        op = ins[0]
+        if op == "jmp":
+            used.add(ins[1])
+        elif op in ("jz", "jnz"):
+            used.add(ins[2])
+    return used
+
+def peephole(lines: List[tuple]) -> List[tuple]:
+    """Return lines with the patterns above removed, to a fixed point."""
+    while True:
+        used = _targets(lines)
+        out: List[tuple] = []
+        dead = False
+        for ins in lines:
+            op = ins[0]
+            if op == LABEL:
+                if ins[1] not in used:
+                    continue
+                dead = False
+            elif op == COMMENT:
+                pass
+            elif dead:
+                continue
+            elif op == "mov" and ins[1] == ins[2]:
+                continue
+            elif op in ("ret", "jmp"):
+                dead = True
+            out.append(ins)
+
+        # fall through instead of jumping to the next line
+        final: List[tuple] = []
+        for i, ins in enumerate(out):
+            if ins[0] == "jmp" and i + 1 < len(out) and out[i + 1] == (LABEL, ins[1]):
+                continue
+            final.append(ins)
+
+        if final == lines:
+            return final
+        lines = final
@@ -0,0 +1,279 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Set, Tuple
+
+# Register allocation for a single TSVM proc.
+# The code generator hands out a fresh virtual register for every variable
+# and temporary; this pass rewrites them onto as few physical registers as
+# possible (Chaitin / Briggs graph coloring with conservative coalescing).
+
+# Instructions are tuples (op, *operands). Register operands are ints (N for
+# rN); labels, literals and callee names are bytes. Two pseudo-ops emit no
+# code: (LABEL, name) marks a jump target and (COMMENT, text) a comment.
+LABEL = ":"
+COMMENT = "#"
+
+# Register budget used by the Briggs coalescing test. Coloring itself never
+# spills: if a proc really needs more registers it simply gets them.
+K = 16
+
+_BINOPS = {"add", "sub", "mul", "div", "lt", "gt", "eq", "neq", "le", "ge", "and", "or"}
+_UNOPS = {"mov", "not"}
+
+def _defs_uses(ins: tuple) -> Optional[Tuple[List[int], List[int]]]:
+    op = ins[0]
+    if op in _BINOPS or op in _UNOPS:
+        return [ins[1]], [x for x in ins[2:] if type(x) is int]
+    if op in ("jz", "jnz"):
+        return [], [ins[1]] if type(ins[1]) is int else []
+    if op == "jmp":
+        return [], []
+    if op == "ret":
+        return [], [0]
+    if op == "call":
+        if ins[1] == b"log":
+            return [], [x for x in ins[2:] if type(x) is int]
+        return [ins[2]], [x for x in ins[3:] if type(x) is int]
+    return None
+
+class _Graph:
+    def __init__(self):
+        self.adj: Dict[int, Set[int]] = {}
+
+    def node(self, v: int):
+        self.adj.setdefault(v, set())
+
+    def edge(self, a: int, b: int):
+        if a == b:
+            return
+        self.adj.setdefault(a, set()).add(b)
+        self.adj.setdefault(b, set()).add(a)
+
+    def interferes(self, a: int, b: int) -> bool:
+        return b in self.adj.get(a, ())
+
+    def merge(self, keep: int, gone: int):
+        for n in self.adj.pop(gone):
+            self.adj[n].discard(gone)
+            self.edge(keep, n)
+
+def allocate(lines: List[tuple], num_params: int = 0) -> List[tuple]:
+    """Rewrite the instructions of one proc onto physical registers.
+
+    r0 (return value) and r1..r<num_params> (incoming arguments) are
+    precolored. Labels and comments pass through untouched. If the body
+    contains an instruction this pass does not understand, the lines are
+    returned unchanged.
+    """
+    precolored = set(range(num_params + 1))
+
+    # ---- decode ----
+    code: List[Tuple[int, tuple, List[int], List[int]]] = []
+    labels: Dict[bytes, int] = {}
+    for lineno, ins in enumerate(lines):
+        op = ins[0]
+        if op == LABEL:
+            labels[ins[1]] = len(code)
+            continue
+        if op == COMMENT:
+            continue
+        du = _defs_uses(ins)
+        if du is None:
+            return list(lines)
+        code.append((lineno, ins, du[0], du[1]))
+
+    n = len(code)
+    label_at = set(labels.values())
+    succ: List[List[int]] = []
+    for i, (_, ins, _, _) in enumerate(code):
+        op = ins[0]
+        if op == "ret":
+            succ.append([])
+        elif op == "jmp":
+            succ.append([labels[ins[1]]] if ins[1] in labels else [])
+        elif op in ("jz", "jnz"):
+            succ.append([j for j in (i + 1, labels.get(ins[2])) if j is not None and j < n])
+        else:
+            succ.append([i + 1] if i + 1 < n else [])
+
+    # ---- liveness ----
+    # Solved per basic block with a worklist, then walked back through each
+    # block once for the per-instruction live-out sets the graph needs.
+    starts = [0] if n else []
+    for i in range(1, n):
+        if code[i - 1][1][0] in ("ret", "jmp", "jz", "jnz") or i in label_at:
+            starts.append(i)
+    nblocks = len(starts)
+    block_of = [0] * n
+    ends = starts[1:] + [n]
+    for b in range(nblocks):
+        for i in range(starts[b], ends[b]):
+            block_of[i] = b
+
+    bsucc = [[block_of[j] for j in succ[ends[b] - 1]] for b in range(nblocks)]
+    bpred: List[List[int]] = [[] for _ in range(nblocks)]
+    for b in range(nblocks):
+        for c in bsucc[b]:
+            bpred[c].append(b)
+    # registers read before any write in the block, and all it writes
+    gen: List[Set[int]] = []
+    kill: List[Set[int]] = []
+    for b in range(nblocks):
+        g_b: Set[int] = set()
+        k_b: Set[int] = set()
+        for i in range(ends[b] - 1, starts[b] - 1, -1):
+            _, _, defs, uses = code[i]
+            g_b.difference_update(defs)
+            g_b.update(uses)
+            k_b.update(defs)
+        gen.append(g_b)
+        kill.append(k_b)
+
+    block_in: List[Set[int]] = [set() for _ in range(nblocks)]
+    block_out: List[Set[int]] = [set() for _ in range(nblocks)]
+    pending = list(range(nblocks))
+    queued = [True] * nblocks
+    while pending:
+        b = pending.pop()
+        queued[b] = False
+        out: Set[int] = set()
+        for c in bsucc[b]:
+            out |= block_in[c]
+        block_out[b] = out
+        inn = gen[b] | (out - kill[b])
+        if inn != block_in[b]:
+            block_in[b] = inn
+            for p in bpred[b]:
+                if not queued[p]:
+                    queued[p] = True
+                    pending.append(p)
+
+    live_out: List[Set[int]] = [None] * n  # type: ignore[list-item]
+    for b in range(nblocks):
+        live = block_out[b]
+        for i in range(ends[b] - 1, starts[b] - 1, -1):
+            live_out[i] = live
+            _, _, defs, uses = code[i]
+            if defs or uses:
+                live = set(live)
+                live.difference_update(defs)
+                live.update(uses)
+    entry_live = block_in[0] if n else set()
+
+    # ---- interference graph ----
+    g = _Graph()
+    for r in precolored:
+        g.node(r)
+    moves: List[Tuple[int, int]] = []
+    for i, (_, ins, defs, uses) in enumerate(code):
+        for v in defs + uses:
+            g.node(v)
+        op = ins[0]
+        src = ins[2] if op == "mov" and type(ins[2]) is int else None
+        if src is not None:
+            moves.append((ins[1], src))
+        for d in defs:
+            for v in live_out[i]:
+                if v != src:
+                    g.edge(d, v)
+        if op == "call":
+            # r0 carries return values, so nothing may sit in it across a call
+            for v in live_out[i]:
+                if v not in defs:
+                    g.edge(0, v)
+    # everything live on entry is "defined" there at the same time
+    entry = sorted(entry_live | set(range(1, num_params + 1)))
+    for x in entry:
+        for y in entry:
+            g.edge(x, y)
+
+    # ---- conservative (Briggs) coalescing ----
+    alias: Dict[int, int] = {}
+
+    def find(v: int) -> int:
+        while v in alias:
+            v = alias[v]
+        return v
+
+    def briggs_ok(a: int, b: int) -> bool:
+        high = 0
+        for m in g.adj[a] | g.adj[b]:
+            if len(g.adj[m]) >= K:
+                high += 1
+                if high >= K:
+                    return False
+        return True
+
+    def george_ok(a: int, b: int) -> bool:
+        # every neighbour of b must already be harmless to a
+        adj_a = g.adj[a]
+        return all(t in adj_a or t in precolored or len(g.adj[t]) < K for t in g.adj[b])
+
+    def can_coalesce(a: int, b: int) -> bool:
+        if a in precolored:
+            return george_ok(a, b)
+        if len(g.adj[b]) > len(g.adj[a]):
+            a, b = b, a
+        if george_ok(a, b):
+            return True
+        # Briggs walks both neighbourhoods; skip it around very busy nodes
+        return len(g.adj[a]) + len(g.adj[b]) <= 4 * K and briggs_ok(a, b)
+
+    changed = True
+    while changed:
+        changed = False
+        for dst, src in moves:
+            a, b = find(dst), find(src)
+            if a == b or g.interferes(a, b):
+                continue
+            if a in precolored and b in precolored:
+                continue
+            if b in precolored:
+                a, b = b, a
+            if not can_coalesce(a, b):
+                continue
+            g.merge(a, b)
+            alias[b] = a
+            changed = True
+
+    # ---- simplify / select ----
+    color: Dict[int, int] = {r: r for r in precolored}
+    work = {v: set(ns) for v, ns in g.adj.items() if v not in precolored}
+    stack: List[int] = []
+    # Nodes go on the stack a round at a time: every node below K degree,
+    # in graph order. A node only joins a later round when removing a
+    # neighbour takes its degree down to K - 1, so each round's list is
+    # gathered as that happens instead of by rescanning what is left.
+    order = {v: i for i, v in enumerate(work)}
+    low = [v for v in work if len(work[v]) < K]
+    while work:
+        if not low:
+            # optimistic: push the busiest node and hope it still colors
+            low = [max(work, key=lambda v: len(work[v]))]
+        crossed: List[int] = []
+        for v in low:
+            stack.append(v)
+            for m in work.pop(v):
+                ns = work.get(m)
+                if ns is not None and v in ns:
+                    ns.discard(v)
+                    if len(ns) == K - 1:
+                        crossed.append(m)
+        low = sorted(crossed, key=order.__getitem__)
+    while stack:
+        v = stack.pop()
+        taken = {color[m] for m in g.adj[v] if m in color}
+        c = 1  # r0 is reserved for return values
+        while c in taken:
+            c += 1
+        color[v] = c
+
+    # ---- rewrite ----
+    out_lines = list(lines)
+    drop: Set[int] = set()
+    for lineno, ins, _, _ in code:
+        new = tuple(color[find(x)] if type(x) is int else x for x in ins)
+        if new[0] == "mov" and new[1] == new[2]:
+            drop.add(lineno)
+            continue
+        out_lines[lineno] = new
+    return [l for i, l in enumerate(out_lines) if i not in drop]
@@ -1,21 +1,72 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from ast_nodes import *
-from symbols import Scope, VarSymbol, FuncSymbol, TES_TYPES
-
-@dataclass
+from symbols import Scope, VarSymbol, FuncSymbol, TES_TYPES, TES_TYPES_DISPLAY
+
+# binary operator -> (operand type, result type, context for errors);
+# an operand type of None means "both sides of the same type"
+_BINOP_TYPES = {
+    "+": ("int", "int", "arithmetic"),
+    "-": ("int", "int", "arithmetic"),
+    "*": ("int", "int", "arithmetic"),
+    "/": ("int", "int", "arithmetic"),
+    "<": (None, "bool", "comparison"),
+    ">": (None, "bool", "comparison"),
+    "<=": (None, "bool", "comparison"),
+    ">=": (None, "bool", "comparison"),
+    "==": (None, "bool", "comparison"),
+    "!=": (None, "bool", "comparison"),
+    "&&": ("bool", "bool", "logical"),
+    "||": ("bool", "bool", "logical"),
+}
+
+# markers on SemanticAnalyzer's work stack: (tag, node)
+_SCOPED = 0     # open a scope and visit the block
+_POP = 1        # close the block's scope
+_FOR_BODY = 2   # open a scope holding the loop variable, visit the body
+_COND = 3       # type a do-while condition, after its body
+_END = 4        # close a function's scope
+_POP_SCOPE = (_POP, None)
+_END_FUNCTION = (_END, None)
+
+@dataclass(slots=True)
 class SemanticError:
-    message: str
+    # The message is built from prefix + template.format(*args) the first
+    # time it is read, so a caller that only checks for errors never pays
+    # for the formatting.
+    prefix: str
+    template: str
+    args: tuple
     line: int
     column: int
+    _message: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = self.prefix + self.template.format(*self.args)
+        return self._message
 
 class SemanticAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[Dict[tuple, List[SemanticError]]] = None):
         self.errors: List[SemanticError] = []
+        self._add_error = self.errors.append
+        # Optional results of earlier runs, for re-checking a program that
+        # changed only in places (watch mode). Pass the same dict to every
+        # analyzer; see analyze_function.
+        self.cache = cache
+        self._signatures: Optional[tuple] = None
         self.global_scope = Scope(parent=None)
         self.current_scope = self.global_scope
+        # Scope objects by nesting depth, reused by _push_scope once the
+        # block that used them has been left
+        self._scope_pool: List[Scope] = []
+        self._scope_top = 0
+        # statements and markers still to visit; see _run_work
+        self._work: List[object] = []
         self.current_function: Optional[FuncSymbol] = None
+        self._fn_prefix = "function '<?>': "
 
         # Define built-in functions
         # print accepts 'null' (any type)
@@ -23,20 +74,81 @@ class SemanticAnalyzer:
         self.global_scope.define_func(FuncSymbol("length", "int", [("x", "vector")], 0, 0))
         self.global_scope.define_func(FuncSymbol("scan", "int", [], 0, 0)) 
 
-    def error(self, msg: str, node: Node):
-        self.errors.append(SemanticError(msg, node.line, node.column))
+        # node type -> visitor. Statements not listed (a BEGIN/END block)
+        # are skipped; expressions not listed type as 'null'.
+        self._stmt_handlers = {
+            FunctionDef: self._visit_nested_function,
+            VarDecl: self._visit_vardecl,
+            Return: self._visit_return,
+            ExprStmt: self._visit_expr_stmt,
+            IfStmt: self._visit_if,
+            WhileStmt: self._visit_while,
+            DoWhileStmt: self._visit_do_while,
+            ForStmt: self._visit_for,
+        }
+        self._expr_handlers = {
+            Number: self._infer_number,
+            String: self._infer_string,
+            MString: self._infer_mstring,
+            Identifier: self._infer_identifier,
+            Assign: self._infer_assign,
+            UnaryOp: self._infer_unary,
+            BinaryOp: self._infer_binary,
+            TernaryOp: self._infer_ternary,
+            VectorLiteral: self._infer_vector,
+            Index: self._infer_index,
+            Call: self._infer_call,
+        }
+
+    def error(self, template: str, node: Node, *args):
+        self._add_error(SemanticError("", template, args, node.line, node.column))
+
+    def _err(self, template: str, node: Node, *args):
+        # error about the function being analyzed; _fn_prefix names it
+        self._add_error(SemanticError(self._fn_prefix, template, args, node.line, node.column))
+
+    def _set_current_function(self, f_sym: Optional[FuncSymbol]):
+        self.current_function = f_sym
+        self._fn_prefix = f"function '{f_sym.name if f_sym else '<?>'}': "
 
     def analyze(self, prog: Program) -> List[SemanticError]:
-        # 1) Register top-level function signatures
-        for fn in prog.functions:
-            if isinstance(fn, FunctionDef):
-                self._declare_function(fn, self.global_scope)
+        for fn in self.declare_functions(prog):
+            self.analyze_function(fn)
+        return self.finish(prog)
+
+    # analyze() in three steps, so a caller can run other per-function work
+    # (code generation) right after each function is checked
+    def declare_functions(self, prog: Program) -> List[FunctionDef]:
+        # 1) Register top-level function signatures; returns the functions
+        # to pass to analyze_function, in order
+        fn_defs = [fn for fn in prog.functions if isinstance(fn, FunctionDef)]
+        for fn in fn_defs:
+            self._declare_function(fn, self.global_scope)
+        self._signatures = None
+        return fn_defs
+
+    def analyze_function(self, fn: FunctionDef):
+        # 2) Analyze one function body
+        if self.cache is None:
+            self._analyze_function(fn)
+            return
 
-        # 2) Analyze each function body
-        for fn in prog.functions:
-            if isinstance(fn, FunctionDef):
-                self._analyze_function(fn)
+        # A top-level function's errors depend only on its own tree and on
+        # the global signatures it can call, so both make up the key.
+        if self._signatures is None:
+            self._signatures = tuple(
+                (f.name, f.return_type, tuple(f.params)) for f in self.global_scope.funcs.values()
+            )
+        key = (repr(fn), self._signatures)
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.errors.extend(hit)
+            return
+        start = len(self.errors)
+        self._analyze_function(fn)
+        self.cache[key] = self.errors[start:]
 
+    def finish(self, prog: Program) -> List[SemanticError]:
         # 3) Check for entry point (main function)
         main_fn = self.global_scope.lookup_func("main")
         if not main_fn:
@@ -47,8 +159,8 @@ class SemanticAnalyzer:
     def _declare_function(self, fn: FunctionDef, scope: Scope):
         if fn.return_type not in TES_TYPES:
             self.error(
-                f"function '{fn.name}': wrong type '{fn.return_type}' found. types must be one of {sorted(TES_TYPES)}",
-                fn
+                "function '{}': wrong type '{}' found. types must be one of {}",
+                fn, fn.name, fn.return_type, TES_TYPES_DISPLAY
             )
             fn.return_type = "null"
 
@@ -56,25 +168,41 @@ class SemanticAnalyzer:
         for p in fn.params:
             if p.type_name not in TES_TYPES:
                 self.error(
-                    f"function '{fn.name}': wrong type '{p.type_name}' found. types must be one of {sorted(TES_TYPES)}",
-                    p
+                    "function '{}': wrong type '{}' found. types must be one of {}",
+                    p, fn.name, p.type_name, TES_TYPES_DISPLAY
                 )
             params.append((p.name, p.type_name))
             
         ok = scope.define_func(FuncSymbol(fn.name, fn.return_type, params, fn.line, fn.column))
         if not ok:
-            self.error(f"function '{fn.name}': duplicate function definition.", fn)
+            self.error("function '{}': duplicate function definition.", fn, fn.name)
 
     def _push_scope(self):
-        self.current_scope = Scope(parent=self.current_scope)
+        pool = self._scope_pool
+        top = self._scope_top
+        if top == len(pool):
+            sc = Scope(parent=self.current_scope)
+            pool.append(sc)
+        else:
+            sc = pool[top]
+            sc.reset(self.current_scope)
+        self._scope_top = top + 1
+        self.current_scope = sc
 
     def _pop_scope(self):
+        self._scope_top -= 1
         self.current_scope = self.current_scope.parent
 
     def _analyze_function(self, fn: FunctionDef):
+        self._enter_function(fn)
+        self._run_work()
+
+    def _enter_function(self, fn: FunctionDef):
+        # Open fn's scope; its body is queued on the work stack and the
+        # scope is closed by the _END_FUNCTION marker after it
         self._push_scope()
         f_sym = self.global_scope.lookup_func(fn.name)
-        self.current_function = f_sym
+        self._set_current_function(f_sym)
 
         # Define parameters in scope (they are considered assigned)
         for pname, ptype in (f_sym.params if f_sym else []):
@@ -84,76 +212,97 @@ class SemanticAnalyzer:
             rtype = self._infer_expr(fn.arrow_return_expr)
             self._check_return_type(fn, rtype, fn.arrow_return_expr)
             self._pop_scope()
-            self.current_function = None
+            self._set_current_function(None)
             return
 
         if fn.body is not None:
-            self._visit_block(fn.body)
-
-        self._pop_scope()
-        self.current_function = None
-
-    def _visit_block(self, block: Block):
-        for st in block.statements:
-            if isinstance(st, FunctionDef):
-                # Nested function: declare in current scope and analyze
-                self._declare_function(st, self.current_scope)
-                self._analyze_function(st)
-            elif isinstance(st, VarDecl):
-                self._visit_vardecl(st)
-            elif isinstance(st, Return):
-                self._visit_return(st)
-            elif isinstance(st, ExprStmt):
-                self._infer_expr(st.expr)
-            elif isinstance(st, IfStmt):
-                self._infer_expr(st.cond)
-                self._push_scope()
-                self._visit_block(st.then_block)
-                self._pop_scope()
-                if st.else_block:
+            self._queue_block(fn.body, _END_FUNCTION)
+        else:
+            self._pop_scope()
+            self._set_current_function(None)
+
+    def _queue_block(self, block: Block, end: tuple):
+        # statements go on top of their end marker, first statement last
+        work = self._work
+        work.append(end)
+        work.extend(reversed(block.statements))
+
+    def _run_work(self):
+        # Nested blocks are visited from an explicit stack instead of by
+        # recursion. An entry is either a statement or a marker tuple
+        # (tag, node) for what has to happen around a block.
+        work = self._work
+        handlers = self._stmt_handlers
+        while work:
+            x = work.pop()
+            visit = handlers.get(type(x))
+            if visit is not None:
+                visit(x)
+            elif type(x) is tuple:
+                tag, node = x
+                if tag == _SCOPED:
+                    self._push_scope()
+                    self._queue_block(node, _POP_SCOPE)
+                elif tag == _POP:
+                    self._pop_scope()
+                elif tag == _FOR_BODY:
                     self._push_scope()
-                    self._visit_block(st.else_block)
+                    self.current_scope.define_var(VarSymbol(node.var_name, "int", node.line, node.column, assigned=True))
+                    self._queue_block(node.body, _POP_SCOPE)
+                elif tag == _COND:
+                    self._infer_expr(node)
+                else:
                     self._pop_scope()
-            elif isinstance(st, WhileStmt):
-                self._infer_expr(st.cond)
-                self._push_scope()
-                self._visit_block(st.body)
-                self._pop_scope()
-            elif isinstance(st, DoWhileStmt):
-                self._push_scope()
-                self._visit_block(st.body)
-                self._pop_scope()
-                self._infer_expr(st.cond)
-            elif isinstance(st, ForStmt):
-                self._infer_expr(st.start)
-                self._infer_expr(st.end)
-                self._push_scope()
-                self.current_scope.define_var(VarSymbol(st.var_name, "int", st.line, st.column, assigned=True))
-                self._visit_block(st.body)
-                self._pop_scope()
-            else:
-                pass
+                    self._set_current_function(None)
+
+    def _visit_nested_function(self, st: FunctionDef):
+        # Nested function: declare in current scope and analyze
+        self._declare_function(st, self.current_scope)
+        self._enter_function(st)
+
+    def _visit_expr_stmt(self, st: ExprStmt):
+        self._infer_expr(st.expr)
+
+    # Compound statements queue their blocks, last one first
+
+    def _visit_if(self, st: IfStmt):
+        self._infer_expr(st.cond)
+        if st.else_block:
+            self._work.append((_SCOPED, st.else_block))
+        self._work.append((_SCOPED, st.then_block))
+
+    def _visit_while(self, st: WhileStmt):
+        self._infer_expr(st.cond)
+        self._work.append((_SCOPED, st.body))
+
+    def _visit_do_while(self, st: DoWhileStmt):
+        self._work.append((_COND, st.cond))
+        self._work.append((_SCOPED, st.body))
+
+    def _visit_for(self, st: ForStmt):
+        self._infer_expr(st.start)
+        self._infer_expr(st.end)
+        self._work.append((_FOR_BODY, st))
 
     def _visit_vardecl(self, vd: VarDecl):
         if vd.type_name not in TES_TYPES:
-            self.error(
-                f"function '{self.current_function.name if self.current_function else '<?>'}': wrong type '{vd.type_name}' found. types must be one of {sorted(TES_TYPES)}",
-                vd
+            self._err(
+                "wrong type '{}' found. types must be one of {}",
+                vd, vd.type_name, TES_TYPES_DISPLAY
             )
             vd.type_name = "null"
 
         ok = self.current_scope.define_var(VarSymbol(vd.name, vd.type_name, vd.line, vd.column, assigned=False))
         if not ok:
-            self.error(
-                f"function '{self.current_function.name if self.current_function else '<?>'}': variable '{vd.name}' already defined in this scope.",
-                vd
+            self._err(
+                "variable '{}' already defined in this scope.",
+                vd, vd.name
             )
         if vd.init is not None:
             init_t = self._infer_expr(vd.init)
-            self._require_type(vd.type_name, init_t, vd.init, f"variable '{vd.name}'")
-            sym = self.current_scope.lookup_var(vd.name)
-            if sym:
-                sym.assigned = True
+            self._require_type(vd.type_name, init_t, vd.init, "variable '{}'", vd.name)
+            # the symbol defined above, or the earlier one it duplicates
+            self.current_scope.vars[vd.name].assigned = True
 
     def _visit_return(self, r: Return):
         rtype = "null"
@@ -161,144 +310,156 @@ class SemanticAnalyzer:
             rtype = self._infer_expr(r.value)
         if self.current_function:
             expected = self.current_function.return_type
-            
-            if expected != rtype and not (expected == "null" and rtype == "null"):
-                 self._require_type(expected, rtype, r, "return value")
+            if expected != rtype:
+                self._require_type(expected, rtype, r, "return value")
 
     # ---------- Expression typing ----------
     def _infer_expr(self, e: Expr) -> str:
-        if isinstance(e, Number):
-            return "int"
-        if isinstance(e, (String, MString)):
-            return "str" if isinstance(e, String) else "mstr"
-        if isinstance(e, Identifier):
-            sym = self.current_scope.lookup_var(e.name)
-            if not sym:
-                self.error(f"function '{self.current_function.name if self.current_function else '<?>'}': variable '{e.name}' is not defined.", e)
-                return "null"
-            if not sym.assigned:
-                self.error(f"function '{self.current_function.name if self.current_function else '<?>'}': Variable '{e.name}' is used before being assigned.", e)
-            return sym.type_name
-
-        if isinstance(e, Assign):
-            target = e.target
-            sym = self.current_scope.lookup_var(target.name)
-            if not sym:
-                self.error(f"function '{self.current_function.name if self.current_function else '<?>'}': variable '{target.name}' is not defined.", e)
-                val_t = self._infer_expr(e.value)
-                return val_t
-            val_t = self._infer_expr(e.value)
-            self._require_type(sym.type_name, val_t, e.value, f"variable '{target.name}'")
-            sym.assigned = True
-            return sym.type_name
-
-        if isinstance(e, UnaryOp):
-            t = self._infer_expr(e.operand)
-            if e.op in ("+", "-"):
-                self._require_type("int", t, e.operand, "unary arithmetic")
-                return "int"
-            if e.op == "!":
-                self._require_type("bool", t, e.operand, "logical not")
-                return "bool"
+        infer = self._expr_handlers.get(type(e))
+        if infer is None:
             return "null"
+        return infer(e)
 
-        if isinstance(e, BinaryOp):
-            lt = self._infer_expr(e.left)
-            rt = self._infer_expr(e.right)
-            
-            # Arithmetic
-            if e.op in ("+", "-", "*", "/"):
-                self._require_type("int", lt, e.left, "arithmetic")
-                self._require_type("int", rt, e.right, "arithmetic")
-                return "int"
-            
-            # Comparison
-            if e.op in ("<", ">", "<=", ">=", "==", "!="):
-                # Allow comparison of same types (or any if unknown)
-                if lt != "any" and rt != "any" and lt != rt:
-                    self.error(
-                        f"function '{self.current_function.name if self.current_function else '<?>'}': comparison types mismatch '{lt}' vs '{rt}'.",
-                        e
-                    )
-                return "bool"
-            
-            # Logical
-            if e.op in ("&&", "||"):
-                self._require_type("bool", lt, e.left, "logical")
-                self._require_type("bool", rt, e.right, "logical")
-                return "bool"
-            return "null"
+    def _infer_number(self, e: Number) -> str:
+        return "int"
 
-        if isinstance(e, TernaryOp):
-            ct = self._infer_expr(e.cond)
-            self._require_type("bool", ct, e.cond, "ternary condition")
-            tt = self._infer_expr(e.then_expr)
-            et = self._infer_expr(e.else_expr)
-            if tt != "any" and et != "any" and tt != et:
-                self.error(
-                    f"function '{self.current_function.name if self.current_function else '<?>'}': ternary branches have different types '{tt}' and '{et}'.",
-                    e
-                )
-            return tt if tt != "any" else et
-
-        if isinstance(e, VectorLiteral):
-            if not e.items:
-                return "vector"
-            # Homogeneity check: all elements should generally be of the same type
-            first_t = self._infer_expr(e.items[0])
-            for item in e.items[1:]:
-                t = self._infer_expr(item)
-                if t != "any" and first_t != "any" and t != first_t:
-                     self.error(f"Vector literal contains mixed types: '{first_t}' vs '{t}'.", item)
-            return "vector"
+    def _infer_string(self, e: String) -> str:
+        return "str"
 
-        if isinstance(e, Index):
-            bt = self._infer_expr(e.base)
-            it = self._infer_expr(e.index)
-            self._require_type("vector", bt, e.base, "index base")
-            self._require_type("int", it, e.index, "index")
-            
-            return "any"
-
-        if isinstance(e, Call):
-            fn_name = e.func.name
-            f = self.current_scope.lookup_func(fn_name) or self.global_scope.lookup_func(fn_name)
-            if not f:
-                self.error(f"function '{self.current_function.name if self.current_function else '<?>'}': function '{fn_name}' is not defined.", e)
-                for a in e.args:
-                    self._infer_expr(a)
-                return "null"
-
-            if len(e.args) != len(f.params):
-                self.error(
-                    f"function '{fn_name}': expects {len(f.params)} arguments but got {len(e.args)}.",
-                    e
-                )
-            
-            # Check argument types
-            for i, arg in enumerate(e.args[:len(f.params)]):
-                expected = f.params[i][1]
-                got = self._infer_expr(arg)
-                self._require_type(expected, got, arg, f"argument {i+1} of '{fn_name}'")
-            return f.return_type
+    def _infer_mstring(self, e: MString) -> str:
+        return "mstr"
 
+    def _infer_identifier(self, e: Identifier) -> str:
+        sym = self.current_scope.lookup_var(e.name)
+        if not sym:
+            self._err("variable '{}' is not defined.", e, e.name)
+            return "null"
+        if not sym.assigned:
+            self._err("Variable '{}' is used before being assigned.", e, e.name)
+        return sym.type_name
+
+    def _infer_assign(self, e: Assign) -> str:
+        target = e.target
+        sym = self.current_scope.lookup_var(target.name)
+        if not sym:
+            self._err("variable '{}' is not defined.", e, target.name)
+            val_t = self._infer_expr(e.value)
+            return val_t
+        val_t = self._infer_expr(e.value)
+        self._require_type(sym.type_name, val_t, e.value, "variable '{}'", target.name)
+        sym.assigned = True
+        return sym.type_name
+
+    def _infer_unary(self, e: UnaryOp) -> str:
+        t = self._infer_expr(e.operand)
+        if e.op in ("+", "-"):
+            self._require_type("int", t, e.operand, "unary arithmetic")
+            return "int"
+        if e.op == "!":
+            self._require_type("bool", t, e.operand, "logical not")
+            return "bool"
         return "null"
 
-    def _require_type(self, expected: str, got: str, node: Node, ctx: str):
+    def _infer_binary(self, e: BinaryOp) -> str:
+        lt = self._infer_expr(e.left)
+        rt = self._infer_expr(e.right)
+
+        rule = _BINOP_TYPES.get(e.op)
+        if rule is None:
+            return "null"
+        operand_t, result_t, ctx = rule
+        if operand_t is None:
+            # Comparison: allow comparison of same types (or any if unknown)
+            if lt != rt and lt != "any" and rt != "any":
+                self._err("comparison types mismatch '{}' vs '{}'.", e, lt, rt)
+            return result_t
+
+        # Arithmetic / logical; operands of the right type, the usual case,
+        # don't need the call
+        if lt != operand_t:
+            self._require_type(operand_t, lt, e.left, ctx)
+        if rt != operand_t:
+            self._require_type(operand_t, rt, e.right, ctx)
+        return result_t
+
+    def _infer_ternary(self, e: TernaryOp) -> str:
+        ct = self._infer_expr(e.cond)
+        self._require_type("bool", ct, e.cond, "ternary condition")
+        tt = self._infer_expr(e.then_expr)
+        et = self._infer_expr(e.else_expr)
+        if tt != et and tt != "any" and et != "any":
+            self._err(
+                "ternary branches have different types '{}' and '{}'.",
+                e, tt, et
+            )
+        return tt if tt != "any" else et
+
+    def _infer_vector(self, e: VectorLiteral) -> str:
+        if not e.items:
+            return "vector"
+        # Homogeneity check: all elements should generally be of the same type.
+        # Items are still typed one by one so their own errors keep their
+        # place between the mismatch reports.
+        infer = self._infer_expr
+        items = iter(e.items)
+        first_t = infer(next(items))
+        if first_t == "any":
+            # nothing to compare against; just type the rest
+            for item in items:
+                infer(item)
+            return "vector"
+        for item in items:
+            t = infer(item)
+            if t != first_t and t != "any":
+                 self.error("Vector literal contains mixed types: '{}' vs '{}'.", item, first_t, t)
+        return "vector"
+
+    def _infer_index(self, e: Index) -> str:
+        bt = self._infer_expr(e.base)
+        it = self._infer_expr(e.index)
+        self._require_type("vector", bt, e.base, "index base")
+        self._require_type("int", it, e.index, "index")
+        
+        return "any"
+
+    def _infer_call(self, e: Call) -> str:
+        fn_name = e.func.name
+        # the scope's flattened view already includes every global function
+        f = self.current_scope.lookup_func(fn_name)
+        if not f:
+            self._err("function '{}' is not defined.", e, fn_name)
+            for a in e.args:
+                self._infer_expr(a)
+            return "null"
+
+        if len(e.args) != len(f.params):
+            self.error(
+                "function '{}': expects {} arguments but got {}.",
+                e, fn_name, len(f.params), len(e.args)
+            )
+        
+        # Check argument types
+        for i, arg in enumerate(e.args[:len(f.params)]):
+            expected = f.params[i][1]
+            got = self._infer_expr(arg)
+            self._require_type(expected, got, arg, "argument {} of '{}'", i + 1, fn_name)
+        return f.return_type
+
+    def _require_type(self, expected: str, got: str, node: Node, ctx: str, *ctx_args):
         """
         Validates that 'got' type matches 'expected' type.
         Allows 'null' (void/untyped params) and 'any' (dynamic from vector index) to pass.
         """
-        if expected == "null":
+        if expected == got or expected == "null":
             return
         if got == "any": 
             return # 'any' matches everything (safe assumption for array access)
-            
-        if expected != got:
-            self.error(
-                f"function '{self.current_function.name if self.current_function else '<?>'}': {ctx} expected to be of type '{expected}', but got '{got}' instead.",
-                node
-            )
+
+        # ctx is a template too, filled in with ctx_args
+        self._err(
+            ctx + " expected to be of type '{}', but got '{}' instead.",
+            node, *ctx_args, expected, got
+        )
 
     def _check_return_type(self, fn: FunctionDef, got: str, node: Node):
         expected = fn.return_type
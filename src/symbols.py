@@ -2,9 +2,11 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Dict, Optional, List
 
-TES_TYPES = {"int", "vector", "str", "mstr", "bool", "null"}
+TES_TYPES = frozenset({"int", "vector", "str", "mstr", "bool", "null"})
+# the order error messages list the types in
+TES_TYPES_DISPLAY = sorted(TES_TYPES)
 
-@dataclass
+@dataclass(slots=True)
 class VarSymbol:
     name: str
     type_name: str
@@ -12,7 +14,7 @@ class VarSymbol:
     defined_col: int
     assigned: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class FuncSymbol:
     name: str
     return_type: str
@@ -20,36 +22,59 @@ class FuncSymbol:
     defined_line: int
     defined_col: int
 
-@dataclass
+@dataclass(slots=True)
 class Scope:
     parent: Optional["Scope"] = None
     vars: Dict[str, VarSymbol] = field(default_factory=dict)
     funcs: Dict[str, FuncSymbol] = field(default_factory=dict)
+    # Every name visible from this scope, innermost definition winning, so
+    # a lookup is one dict probe instead of a walk up the parents. A scope
+    # shares its parent's view until it defines something of its own.
+    # Scopes are used as a stack: a parent never gains names while one of
+    # its children is alive, so the view can't go stale.
+    visible_vars: Dict[str, VarSymbol] = field(init=False, repr=False)
+    visible_funcs: Dict[str, FuncSymbol] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.parent is None:
+            self.visible_vars = dict(self.vars)
+            self.visible_funcs = dict(self.funcs)
+        else:
+            self.visible_vars = self.parent.visible_vars
+            self.visible_funcs = self.parent.visible_funcs
+            if self.vars:
+                self.visible_vars = {**self.visible_vars, **self.vars}
+            if self.funcs:
+                self.visible_funcs = {**self.visible_funcs, **self.funcs}
+
+    def reset(self, parent: "Scope"):
+        """Reuse this scope as a new, empty child of parent."""
+        self.parent = parent
+        self.vars.clear()
+        self.funcs.clear()
+        self.visible_vars = parent.visible_vars
+        self.visible_funcs = parent.visible_funcs
 
     def define_var(self, sym: VarSymbol) -> bool:
         if sym.name in self.vars:
             return False
+        if not self.vars and self.parent is not None:
+            self.visible_vars = dict(self.visible_vars)
         self.vars[sym.name] = sym
+        self.visible_vars[sym.name] = sym
         return True
 
     def define_func(self, sym: FuncSymbol) -> bool:
         if sym.name in self.funcs:
             return False
+        if not self.funcs and self.parent is not None:
+            self.visible_funcs = dict(self.visible_funcs)
         self.funcs[sym.name] = sym
+        self.visible_funcs[sym.name] = sym
         return True
 
     def lookup_var(self, name: str) -> Optional[VarSymbol]:
-        cur = self
-        while cur:
-            if name in cur.vars:
-                return cur.vars[name]
-            cur = cur.parent
-        return None
+        return self.visible_vars.get(name)
 
     def lookup_func(self, name: str) -> Optional[FuncSymbol]:
-        cur = self
-        while cur:
-            if name in cur.funcs:
-                return cur.funcs[name]
-            cur = cur.parent
-        return None
+        return self.visible_funcs.get(name)